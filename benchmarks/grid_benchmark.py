@@ -0,0 +1,73 @@
+"""
+Time the work done for each edit of a diagram, which is finding the
+arrows that cross a moved arrow, on torus knot diagrams of increasing
+size.  The arrow grid of a LinkManager is compared with scanning every
+arrow, and both must find the same arrows.  Run it from the top of the
+repository:
+
+    python benchmarks/grid_benchmark.py
+"""
+
+import os
+import random
+import sys
+import time
+from math import cos, sin, pi
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                'vplink_src'))
+
+from manager import LinkManager
+
+
+def torus_knot(p, q, size, scale):
+    """
+    Return a LinkManager for a polygonal (p, q) torus knot with the
+    given number of edges.  The points are jittered so that the
+    diagram is generic.
+    """
+    rand = random.Random(size)
+    vertices = []
+    for n in range(size):
+        s = 2 * pi * n / size
+        r = 2 + cos(q * s)
+        vertices.append((scale * (r * cos(p * s) + rand.uniform(-0.02, 0.02)),
+                         scale * (r * sin(p * s) + rand.uniform(-0.02, 0.02))))
+    arrows = [(n, (n + 1) % size) for n in range(size)]
+    manager = LinkManager()
+    manager.unpickle(vertices, arrows, [])
+    manager.update_crosspoints()
+    return manager
+
+
+def crossed_by_grid(manager, arrow):
+    return [a for a in manager.crossing_candidates(arrow) if arrow ^ a]
+
+
+def crossed_by_scan(manager, arrow):
+    return [a for a in manager.Arrows if a is not arrow and arrow ^ a]
+
+
+def main(samples=200):
+    print('segments  crossings   scan/edit    grid/edit')
+    for size in 250, 1000, 2000, 4000:
+        manager = torus_knot(size // 250 + 2, size // 100 + 3, size,
+                             size * 0.5)
+        crossings = sum(len(crossed_by_grid(manager, arrow))
+                        for arrow in manager.Arrows) // 2
+        sample = random.Random(1).choices(manager.Arrows, k=samples)
+        times = []
+        for search in crossed_by_scan, crossed_by_grid:
+            start = time.perf_counter()
+            found = [set(search(manager, arrow)) for arrow in sample]
+            times.append((time.perf_counter() - start) / samples)
+            if search is crossed_by_scan:
+                expected = found
+            else:
+                assert found == expected
+        print('%8d %10d %9.1f us %9.1f us' % (
+            size, crossings, 1e6 * times[0], 1e6 * times[1]))
+
+
+if __name__ == '__main__':
+    main()
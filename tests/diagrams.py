@@ -0,0 +1,98 @@
+"""
+Link diagrams for the tests, built from closed polygonal curves in
+space by projecting them to the plane.
+"""
+
+import os
+import sys
+from math import cos, sin, pi
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                'vplink_src'))
+
+from manager import LinkManager
+
+
+def trefoil(s):
+    return ((2 + cos(3 * s)) * cos(2 * s), (2 + cos(3 * s)) * sin(2 * s),
+            sin(3 * s))
+
+
+def cinquefoil(s):
+    return ((2 + cos(5 * s)) * cos(2 * s), (2 + cos(5 * s)) * sin(2 * s),
+            sin(5 * s))
+
+
+def torus_knot(q):
+    """
+    Return the curve of the (2, q) torus knot, for q odd, which has a
+    diagram with q crossings.
+    """
+    def curve(s):
+        return ((2 + cos(q * s)) * cos(2 * s), (2 + cos(q * s)) * sin(2 * s),
+                sin(q * s))
+    return curve
+
+
+def figure_eight(s):
+    return ((2 + cos(2 * s)) * cos(3 * s), (2 + cos(2 * s)) * sin(3 * s),
+            sin(4 * s))
+
+
+def circle(s):
+    return cos(s), sin(s), 0.0
+
+
+def shifted_circle(s):
+    # Crosses the unit circle over at the top and under at the bottom.
+    return 1 + cos(s), sin(s), sin(s)
+
+
+def distant_circle(s):
+    return 6 + cos(s), sin(s), 0.0
+
+
+def polygon(curve, size=48, scale=100):
+    points = []
+    for n in range(size):
+        # The offset keeps the vertices off the crossings.
+        x, y, z = curve(2 * pi * (n + 0.3) / size)
+        points.append((250 + scale * x, 250 + scale * y, z))
+    return points
+
+
+def diagram(*curves, mirror=False, size=48, scale=100):
+    """
+    Return a LinkManager for the projection of the closed curves,
+    each given as a function on [0, 2 pi] with values (x, y, z).  At
+    each crossing the strand with the larger z passes over, or under
+    if mirror is True.  Each curve is sampled at size points, and
+    scaled by scale.
+    """
+    vertices, arrows, heights = [], [], []
+    for curve in curves:
+        points = polygon(curve, size, scale)
+        base = len(vertices)
+        for x, y, z in points:
+            vertices.append((x, y))
+            heights.append(z)
+        arrows += [(base + n, base + (n + 1) % len(points))
+                   for n in range(len(points))]
+    manager = LinkManager()
+    manager.unpickle(vertices, arrows, [])
+    # There is no canvas to draw the arrows on.
+    for arrow in manager.Arrows:
+        arrow.style = 'hidden'
+    manager.repair_crossings()
+    z = {vertex: h for vertex, h in zip(manager.Vertices, heights)}
+
+    def height(crossing, arrow):
+        t = crossing.height(arrow)
+        return (1 - t) * z[arrow.start] + t * z[arrow.end]
+
+    for crossing in list(manager.Crossings):
+        over_is_higher = (height(crossing, crossing.over) >
+                          height(crossing, crossing.under))
+        if over_is_higher == mirror:
+            manager.reverse_crossing(crossing)
+    return manager
@@ -0,0 +1,162 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                'vplink_src'))
+
+from invariants import signature_and_determinant, kauffman_bracket
+from diagrams import (diagram, trefoil, cinquefoil, torus_knot, figure_eight,
+                      circle, shifted_circle, distant_circle)
+
+# Each entry gives the curves of a diagram, its signature and its
+# determinant.  The knots are right handed.
+links = [((circle,), 0, 1),
+         ((trefoil,), -2, 3),
+         ((cinquefoil,), -4, 5),
+         ((figure_eight,), 0, 5),
+         ((circle, shifted_circle), -1, 2),
+         ((circle, distant_circle), 0, 0),
+         ((trefoil, distant_circle), -2, 0)]
+
+# The Alexander polynomials of the same diagrams, starting with the
+# constant term.
+alexander = [[1], [1, -1, 1], [1, -1, 1, -1, 1], [1, -3, 1], [-1, 1],
+             [0], [0]]
+
+# Their Jones polynomials, as dicts mapping powers of t to coefficients.
+jones = [{0: 1},
+         {1: 1, 3: 1, 4: -1},
+         {2: 1, 4: 1, 5: -1, 6: 1, 7: -1},
+         {-2: 1, -1: -1, 0: 1, 1: -1, 2: 1},
+         {0.5: -1, 2.5: -1},
+         {-0.5: -1, 0.5: -1},
+         {0.5: -1, 1.5: -1, 2.5: -1, 4.5: 1}]
+
+
+class SignatureAndDeterminant(unittest.TestCase):
+
+    def test_diagonal(self):
+        self.assertEqual(signature_and_determinant([[3, 0], [0, -1]]), (0, 3))
+        self.assertEqual(signature_and_determinant([[2, 1], [1, 2]]), (2, 3))
+
+    def test_zero_diagonal(self):
+        # No diagonal pivot is available, so the elimination has to
+        # combine rows and columns first.
+        self.assertEqual(signature_and_determinant([[0, 1], [1, 0]]), (0, 1))
+        self.assertEqual(signature_and_determinant([[0, 2], [2, 0]]), (0, 4))
+        self.assertEqual(
+            signature_and_determinant([[1, 0, 0], [0, 0, 3], [0, 3, 0]]),
+            (1, 9))
+
+    def test_singular(self):
+        self.assertEqual(
+            signature_and_determinant([[0, 1, 0], [1, 0, 0], [0, 0, 0]]),
+            (0, 0))
+
+
+class GoeritzInvariants(unittest.TestCase):
+
+    def test_known_values(self):
+        for curves, signature, determinant in links:
+            manager = diagram(*curves)
+            self.assertEqual(manager.signature(), signature)
+            self.assertEqual(manager.determinant(), determinant)
+
+    def test_mirror(self):
+        for curves, signature, determinant in links:
+            manager = diagram(*curves, mirror=True)
+            self.assertEqual(manager.signature(), -signature)
+            self.assertEqual(manager.determinant(), determinant)
+
+    def test_parity(self):
+        # If the determinant is not 0 then the signature of a link
+        # with m components is congruent to m - 1 modulo 2.
+        for curves, signature, determinant in links:
+            manager = diagram(*curves)
+            if manager.determinant():
+                self.assertEqual(
+                    (manager.signature() - len(curves) + 1) % 2, 0)
+
+    def test_virtual(self):
+        manager = diagram(trefoil)
+        manager.toggle_virtual(next(iter(manager.Crossings)))
+        self.assertIsNone(manager.signature())
+        self.assertIsNone(manager.determinant())
+
+
+class AlexanderPolynomial(unittest.TestCase):
+
+    def test_known_values(self):
+        for (curves, signature, determinant), polynomial in zip(links,
+                                                                 alexander):
+            for mirror in False, True:
+                manager = diagram(*curves, mirror=mirror)
+                self.assertEqual(manager.alexander_polynomial(), polynomial)
+
+    def test_determinant(self):
+        for curves, signature, determinant in links:
+            manager = diagram(*curves)
+            polynomial = manager.alexander_polynomial()
+            value = sum(a * (-1) ** n for n, a in enumerate(polynomial))
+            self.assertEqual(abs(value), manager.determinant())
+            # |A(1)| is 1 for a knot and 0 for a link.
+            self.assertEqual(abs(sum(polynomial)), len(curves) == 1)
+
+    def test_large_knot(self):
+        manager = diagram(torus_knot(101), size=808, scale=303)
+        self.assertEqual(len(manager.Crossings), 101)
+        start = time.time()
+        polynomial = manager.alexander_polynomial()
+        self.assertLess(time.time() - start, 2)
+        self.assertEqual(polynomial, [1, -1] * 50 + [1])
+
+    def test_virtual(self):
+        manager = diagram(figure_eight)
+        manager.toggle_virtual(next(iter(manager.Crossings)))
+        self.assertIsNone(manager.alexander_polynomial())
+
+
+class JonesPolynomial(unittest.TestCase):
+
+    def test_known_values(self):
+        for (curves, signature, determinant), polynomial in zip(links, jones):
+            self.assertEqual(diagram(*curves).jones_polynomial(), polynomial)
+            mirror = {-n: a for n, a in polynomial.items()}
+            self.assertEqual(diagram(*curves, mirror=True).jones_polynomial(),
+                             mirror)
+
+    def test_determinant(self):
+        # |V(-1)| is the determinant, where t^(1/2) = i.
+        for curves, signature, determinant in links:
+            manager = diagram(*curves)
+            value = sum(a * 1j ** int(2 * n)
+                        for n, a in manager.jones_polynomial().items())
+            self.assertAlmostEqual(abs(value), manager.determinant())
+
+    def test_virtual(self):
+        manager = diagram(cinquefoil)
+        manager.toggle_virtual(next(iter(manager.Crossings)))
+        polynomial = manager.jones_polynomial()
+        self.assertNotEqual(polynomial, jones[2])
+        # V(1) = 1 for virtual knots too.
+        self.assertEqual(sum(polynomial.values()), 1)
+
+    def test_processes(self):
+        # The work is only shared out for more than 8 crossings.
+        manager = diagram(torus_knot(11), size=88, scale=100)
+        for virtual in False, True:
+            if virtual:
+                manager.toggle_virtual(next(iter(manager.Crossings)))
+            planar_map = manager.planar_map(skip_virtual=True)
+            self.assertGreater(len(planar_map.crossings), 8)
+            self.assertEqual(kauffman_bracket(planar_map, processes=2),
+                             kauffman_bracket(planar_map))
+            # The cached bracket is shared by every number of processes.
+            self.assertIs(manager.kauffman_bracket(processes=2),
+                          manager.kauffman_bracket())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+
+from diagrams import diagram, trefoil
+
+
+class Translate(unittest.TestCase):
+
+    def test_crossings_move(self):
+        manager = diagram(trefoil)
+        before = {c: (c.x, c.y) for c in manager.Crossings}
+        self.assertEqual(manager.translate(13.5, -7.25), [])
+        self.assertEqual(len(manager.Crossings), 3)
+        for crossing in manager.Crossings:
+            x, y = before[crossing]
+            self.assertAlmostEqual(crossing.x, x + 13.5)
+            self.assertAlmostEqual(crossing.y, y - 7.25)
+            self.assertTrue(crossing.is_located())
+            point = manager.CrossPoints[crossing]
+            self.assertEqual((point.x, point.y), (crossing.x, crossing.y))
+            self.assertIs(manager.find_crossing(crossing.x, crossing.y),
+                          crossing)
+            self.assertIsNone(manager.find_crossing(x, y))
+
+    def test_crossing_near_arrow(self):
+        manager = diagram(trefoil)
+        crossing = next(iter(manager.Crossings))
+        arrow = next(a for a in manager.Arrows if a not in crossing)
+        manager.translate(40, 40)
+        x, y = crossing.x, crossing.y
+        arrow.start.x, arrow.start.y = x - 20, y - 1
+        arrow.end.x, arrow.end.y = x + 20, y + 1
+        arrow.vectorize()
+        manager.index_arrow(arrow)
+        self.assertIs(manager.crossing_near_arrow(arrow),
+                      manager.CrossPoints[crossing])
+
+
+class Generation(unittest.TestCase):
+
+    def test_edits_are_counted(self):
+        manager = diagram(trefoil)
+        crossing = next(iter(manager.Crossings))
+        vertex = manager.Vertices[0]
+        edits = [lambda: manager.reverse_crossing(crossing),
+                 lambda: manager.toggle_virtual(crossing),
+                 lambda: manager.index_vertex(vertex),
+                 lambda: manager.reverse_path(vertex),
+                 lambda: manager.translate(5, 5)]
+        topology = manager.topology
+        for edit in edits:
+            generation = manager.generation_count
+            edit()
+            self.assertGreater(manager.generation_count, generation)
+        self.assertEqual(manager.topology, topology + 1)
+
+    def test_components_follow_reversal(self):
+        manager = diagram(trefoil)
+        before = manager.arrow_components()[0]
+        manager.reverse_path(manager.Vertices[0])
+        after = manager.arrow_components()[0]
+        self.assertEqual(set(before), set(after))
+        self.assertIs(after[1].start, after[0].end)
+        self.assertIs(after[0].start, before[0].end)
+
+    def test_patched_codes(self):
+        manager = diagram(trefoil)
+        codes = manager.crossing_codes()
+        crossing = next(iter(manager.Crossings))
+        manager.reverse_crossing(crossing)
+        patched = manager.crossing_codes()
+        self.assertNotEqual(patched['signed_DT'], codes['signed_DT'])
+        manager.code_cache = None
+        self.assertEqual(patched, manager.crossing_codes())
+
+    def test_memo(self):
+        manager = diagram(trefoil)
+        code = manager.DT_code()
+        self.assertIs(manager.DT_code(), code)
+        manager.reverse_crossing(next(iter(manager.Crossings)))
+        self.assertIsNot(manager.DT_code(), code)
+        self.assertNotEqual(manager.DT_code(), code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from diagrams import diagram, trefoil, figure_eight, circle, shifted_circle
+
+
+class Faces(unittest.TestCase):
+
+    def check_map(self, planar_map):
+        edges = planar_map.num_edges()
+        # Every half-edge lies on exactly one face, and on the face
+        # recorded for it.
+        half_edges = sorted(h for face in planar_map.faces for h in face)
+        self.assertEqual(half_edges, list(range(2 * edges)))
+        for f, face in enumerate(planar_map.faces):
+            for h in face:
+                self.assertEqual(planar_map.face[h], f)
+        # The rotation at each crossing is a 4-cycle through the
+        # positions listed in at.
+        for v in range(len(planar_map.crossings)):
+            positions = planar_map.at[4 * v:4 * v + 4]
+            for k in range(4):
+                h = positions[k]
+                self.assertEqual(planar_map.origin[h], v)
+                self.assertEqual(planar_map.rotation[h], positions[(k + 1) % 4])
+
+    def test_knots(self):
+        for curve, crossings in (trefoil, 3), (figure_eight, 4):
+            planar_map = diagram(curve).planar_map()
+            self.check_map(planar_map)
+            self.assertEqual(len(planar_map.crossings), crossings)
+            self.assertEqual(planar_map.num_edges(), 2 * crossings)
+            self.assertEqual(len(planar_map.faces), crossings + 2)
+            self.assertEqual(planar_map.pieces(), 1)
+            self.assertEqual(planar_map.free_loops, 0)
+            self.assertEqual(set(planar_map.component), {0})
+
+    def test_link(self):
+        planar_map = diagram(circle, shifted_circle).planar_map()
+        self.check_map(planar_map)
+        self.assertEqual(len(planar_map.faces), 4)
+        self.assertEqual(sorted(planar_map.component), [0, 0, 1, 1])
+
+    def test_unknot(self):
+        planar_map = diagram(circle).planar_map()
+        self.assertEqual(planar_map.num_edges(), 0)
+        self.assertEqual(planar_map.faces, [])
+        self.assertEqual(planar_map.free_loops, 1)
+
+    def test_face_colors(self):
+        planar_map = diagram(figure_eight).planar_map()
+        colors = planar_map.face_colors()
+        for h in range(2 * planar_map.num_edges()):
+            self.assertNotEqual(colors[planar_map.face[h]],
+                                colors[planar_map.face[h ^ 1]])
+
+
+class Genus(unittest.TestCase):
+
+    def test_classical(self):
+        for curves in (trefoil,), (figure_eight,), (circle, shifted_circle):
+            self.assertEqual(diagram(*curves).virtual_genus(), 0)
+            self.assertEqual(diagram(*curves, mirror=True).virtual_genus(), 0)
+        self.assertEqual(diagram(circle).virtual_genus(), 0)
+
+    def test_virtual_trefoil(self):
+        manager = diagram(trefoil)
+        crossing = next(iter(manager.Crossings))
+        manager.toggle_virtual(crossing)
+        self.assertEqual(manager.virtual_genus(), 1)
+        # With the virtual crossing as a vertex the map is planar.
+        self.assertEqual(manager.planar_map().genus(), 0)
+        manager.toggle_virtual(crossing)
+        self.assertEqual(manager.virtual_genus(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
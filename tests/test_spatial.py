@@ -0,0 +1,128 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                'vplink_src'))
+
+from spatial import SegmentGrid, PointGrid
+
+
+class Segments(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = SegmentGrid(cell_size=10)
+        self.grid.insert('a', 0, 0, 25, 5)
+        self.grid.insert('b', 100, 100, 90, 80)
+
+    def test_insert(self):
+        self.assertEqual(len(self.grid), 2)
+        self.assertIn('a', self.grid)
+        self.assertEqual(self.grid.boxes['a'], (0, 0, 2, 0))
+        # The corners may be given in either order.
+        self.assertEqual(self.grid.boxes['b'], (9, 8, 10, 10))
+
+    def test_query(self):
+        self.assertEqual(self.grid.query(20, 2, 22, 3), ['a'])
+        self.assertEqual(self.grid.query(95, 95, 95, 95), ['b'])
+        self.assertEqual(self.grid.query(50, 50, 60, 60), [])
+        self.assertEqual(self.grid.query(50, 50, 60, 60, margin=35),
+                         ['b'])
+        self.assertEqual(sorted(self.grid.query(0, 0, 100, 100)),
+                         ['a', 'b'])
+
+    def test_move(self):
+        self.grid.insert('a', 50, 50, 55, 55)
+        self.assertEqual(len(self.grid), 2)
+        self.assertEqual(self.grid.query(20, 2, 22, 3), [])
+        self.assertEqual(self.grid.query(52, 52, 52, 52), ['a'])
+        self.assertNotIn((2, 0), self.grid.cells)
+
+    def test_remove(self):
+        self.grid.remove('a')
+        self.grid.remove('a')
+        self.assertNotIn('a', self.grid)
+        self.assertEqual(self.grid.query(0, 0, 30, 10), [])
+        self.assertEqual(list(self.grid.cells), [(9, 8), (9, 9), (9, 10),
+                                                 (10, 8), (10, 9), (10, 10)])
+
+    def test_translate(self):
+        self.grid.translate(1000, -500)
+        self.assertEqual(self.grid.query(20, 2, 22, 3), [])
+        self.assertEqual(self.grid.query(1020, -498, 1022, -497), ['a'])
+        self.grid.insert('a', 1050, -450, 1055, -445)
+        self.assertEqual(self.grid.query(1052, -448, 1052, -448), ['a'])
+        self.assertEqual(self.grid.query(1095, -405, 1095, -405), ['b'])
+
+    def test_rebuild(self):
+        self.grid.rebuild([('c', 0, 0, 100, 0), ('d', 0, 0, 0, 60)])
+        self.assertEqual(len(self.grid), 2)
+        self.assertNotIn('a', self.grid)
+        self.assertEqual(self.grid.cell_size, 80)
+        self.assertEqual(sorted(self.grid.query(0, 0, 0, 0)), ['c', 'd'])
+        self.grid.rebuild([('e', 0, 0, 1, 1)])
+        self.assertEqual(self.grid.cell_size, SegmentGrid.min_cell_size)
+
+
+class Points(unittest.TestCase):
+
+    def setUp(self):
+        self.grid = PointGrid(cell_size=10)
+        self.grid.insert('a', 5, 5)
+        self.grid.insert('b', 12, 5)
+        self.grid.insert('c', 100, 100)
+
+    def test_insert(self):
+        self.assertEqual(len(self.grid), 3)
+        self.assertIn('c', self.grid)
+        self.assertEqual(sorted(self.grid.cells), [(0, 0), (1, 0),
+                                                   (10, 10)])
+
+    def test_query(self):
+        self.assertEqual(self.grid.query(1, 1, 2, 2), ['a'])
+        self.assertEqual(sorted(self.grid.query(1, 1, 2, 2, margin=9)),
+                         ['a', 'b'])
+        self.assertEqual(self.grid.query(50, 50, 60, 60), [])
+
+    def test_nearest(self):
+        self.assertEqual(self.grid.nearest(9, 5, 8), 'b')
+        self.assertEqual(self.grid.nearest(8, 5, 8), 'a')
+        self.assertEqual(self.grid.nearest(8, 5, 8, lambda x: x != 'a'), 'b')
+        # Distances are measured in the L1 norm.
+        self.assertIsNone(self.grid.nearest(95, 95, 8))
+        self.assertEqual(self.grid.nearest(96, 96, 8.5), 'c')
+
+    def test_move(self):
+        self.grid.insert('a', 100, 104)
+        self.assertEqual(len(self.grid), 3)
+        self.assertEqual(self.grid.nearest(5, 5, 5), None)
+        self.assertEqual(self.grid.nearest(100, 103, 5), 'a')
+        self.assertNotIn((0, 0), self.grid.cells)
+
+    def test_remove(self):
+        self.grid.remove('c')
+        self.grid.remove('c')
+        self.assertNotIn('c', self.grid)
+        self.assertIsNone(self.grid.nearest(100, 100, 5))
+        self.assertNotIn((10, 10), self.grid.cells)
+
+    def test_translate(self):
+        self.grid.translate(-7, 300)
+        self.assertIsNone(self.grid.nearest(5, 5, 1))
+        self.assertEqual(self.grid.nearest(-2, 305, 1), 'a')
+        self.assertEqual(self.grid.nearest(93, 400, 1), 'c')
+        self.grid.insert('d', 0, 0)
+        self.assertEqual(self.grid.nearest(1, 1, 3), 'd')
+
+    def test_rebuild(self):
+        self.grid.translate(50, 50)
+        self.grid.rebuild([('d', 1, 1), ('e', 2, 2)])
+        self.assertEqual(len(self.grid), 2)
+        self.assertEqual(self.grid.origin, (0.0, 0.0))
+        self.assertNotIn('a', self.grid)
+        self.assertEqual(self.grid.nearest(0, 0, 3), 'd')
+        self.assertEqual(self.grid.nearest(3, 3, 3), 'e')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,10 +39,12 @@ class Arrow:
         self.canvas = canvas
         self.color = color
         self.component = None
+        self.id = None  # The position in the diagram's list of arrows.
         self.style = 'normal'
         self.lines = []
         self.dots = []
         self.cross_params = []
+        self.crossing_cache = None
         if other_params is None:
             other_params = default_arrow_params.copy()
         self.params = other_params
@@ -107,6 +109,45 @@ class Arrow:
         self.style = 'normal'
         self.draw(crossings)
 
+    def geometry(self):
+        """
+        The data which determine where this arrow meets other arrows.
+        """
+        return (self.start.x, self.start.y, self.dx, self.dy)
+
+    def crossings_along(self, crossings):
+        """
+        Return a list of pairs (t, crossing), sorted by t, for the
+        crossings involving this arrow, where t is the barycentric
+        coordinate at which the crossing lies on this arrow.
+
+        When crossings is a CrossingRegistry the list is cached on the
+        arrow.  The cache is discarded when a crossing of the arrow is
+        added or removed, and the list is recomputed when this arrow or
+        one of the arrows crossing it has moved.
+        """
+        try:
+            mine = crossings.crossings_of(self)
+        except AttributeError:
+            mine = [c for c in crossings if self in c]
+            cache = False
+        else:
+            cache = True
+        others = [c.under if c.over is self else c.over for c in mine]
+        if cache:
+            key = (self.geometry(),) + tuple(A.geometry() for A in others)
+            if self.crossing_cache and self.crossing_cache[0] == key:
+                return self.crossing_cache[1]
+        along = []
+        for c, other in zip(mine, others):
+            t = self ^ other
+            if t:
+                along.append((t, c))
+        along.sort(key=lambda pair: pair[0])
+        if cache:
+            self.crossing_cache = (key, along)
+        return along
+
     def find_segments(self, crossings, include_overcrossings=False):
         """
         Return a list of segments that make up this arrow, each
@@ -122,15 +163,13 @@ class Arrow:
         segments = []
         self.vectorize()
         cross_params = [(0.0, False), (1.0, False)]
-        for c in crossings:
+        include_overcrossings = (include_overcrossings or
+                                 params['include_overcrossings'])
+        for t, c in self.crossings_along(crossings):
             if c.under == self:
-                t = self ^ c.over
-                if t:
-                    cross_params.append((t, not c.is_virtual))
-            if c.over == self and (include_overcrossings or params['include_overcrossings']):
-                t = self ^ c.under
-                if t:
-                    cross_params.append((t, False))
+                cross_params.append((t, not c.is_virtual))
+            elif include_overcrossings:
+                cross_params.append((t, False))
         cross_params.sort()
 
         def r(t):
@@ -190,11 +229,15 @@ class Arrow:
             x0, y0, x1, y1,
             arrow=arrow,
             width=thickness, fill=color, tags='transformable'))
+        try:
+            mine = crossings.crossings_of(self)
+        except AttributeError:
+            mine = [c for c in crossings if self in c]
         if recurse:
-            under_arrows = [c.under for c in crossings if c.over == self]
+            under_arrows = [c.under for c in mine if c.over == self]
             for arrow in under_arrows:
                 arrow.draw(crossings, recurse=False)
-        for c in crossings:
+        for c in mine:
             if self == c.under and c.is_virtual:
                 self.dots.append(self.canvas.create_oval(
                     c.x - 10, c.y - 10, c.x + 10, c.y + 10,
@@ -0,0 +1,129 @@
+#
+#   Copyright (C) 2007-present Marc Culler, Nathan Dunfield and others.
+#
+#   This program is distributed under the terms of the
+#   GNU General Public License, version 2 or later, as published by
+#   the Free Software Foundation.  See the file gpl-2.0.txt for details.
+#   The URL for this program is
+#     http://www.math.uic.edu/~t3m/plink
+#   A copy of the license file may be found at:
+#     http://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+#
+#   The development of this program was partially supported by
+#   the National Science Foundation under grants DMS0608567,
+#   DMS0504975 and DMS0204142.
+"""
+This module exports the function canonical_code, which computes a
+form of the signed Gauss code of a link diagram which does not depend
+on how the diagram was drawn: the order of the components, the
+starting point of each component, the numbering of the crossings or
+the orientation of the link.
+"""
+
+
+def canonical_code(components, mirror=False):
+    """
+    The argument is a list of components, each given as a list of
+    passages through crossings, in order.  A passage is a triple
+    (crossing, over, sign) where crossing is any hashable object which
+    identifies the crossing, over is True if the passage goes over the
+    crossing and sign is 1 or -1 for a right or left handed crossing.
+    Every crossing must be passed through exactly twice.
+
+    Returns a tuple of integers.  Two diagrams have the same canonical
+    code if and only if their signed Gauss codes agree after renaming
+    the crossings, reordering the components, choosing new starting
+    points and possibly reversing the orientation of every component.
+    If mirror is True, the code of the mirror image (with every
+    crossing reversed) is considered too, so that a diagram and its
+    mirror image have the same code.
+
+    The code of each connected piece of the diagram is the smallest
+    of the codes obtained by starting at one of its passages; each of
+    these takes linear time to compute.
+    """
+    components = [list(component) for component in components]
+    where = {}
+    for n, component in enumerate(components):
+        for i, (crossing, over, sign) in enumerate(component):
+            where.setdefault(crossing, []).append((n, i))
+    pieces = _connected_pieces(components, where)
+    codes = []
+    for piece in pieces:
+        # Every code starts with the passage it starts at, so only the
+        # starts whose passage has the smallest encoding need be tried.
+        starts = []
+        for n in piece:
+            for i, (crossing, over, sign) in enumerate(components[n]):
+                for mirrored in ((False, True) if mirror else (False,)):
+                    if mirrored:
+                        first = (2 if over else 1, -sign)
+                    else:
+                        first = (1 if over else 2, sign)
+                    starts.append((first, n, i, mirrored))
+        if not starts:
+            codes.append(())
+            continue
+        best = min(first for first, n, i, mirrored in starts)
+        codes.append(min(_code(components, where, n, i, reverse, mirrored)
+                         for first, n, i, mirrored in starts if first == best
+                         for reverse in (False, True)))
+    codes.sort()
+    result = []
+    for code in codes:
+        result += code
+        result.append(-1)
+    return tuple(result)
+
+
+def _connected_pieces(components, where):
+    # Group the components which are joined by crossings.
+    parent = list(range(len(components)))
+
+    def root(n):
+        while parent[n] != n:
+            parent[n] = parent[parent[n]]
+            n = parent[n]
+        return n
+
+    for (m, i), (n, j) in where.values():
+        parent[root(m)] = root(n)
+    pieces = {}
+    for n in range(len(components)):
+        pieces.setdefault(root(n), []).append(n)
+    return list(pieces.values())
+
+
+def _code(components, where, n, i, reverse, mirrored):
+    # The code obtained by starting at passage i of component n.
+    # Crossings are numbered from 1 in order of first appearance.  The
+    # next component is the one reached through the lowest numbered
+    # crossing which leads to a component not yet traversed, starting
+    # at that crossing.  Each passage contributes 3 integers and each
+    # component ends with a 0.
+    numbers, numbered, done = {}, [], set()
+    step = -1 if reverse else 1
+    result, next_index = [], 0
+    while True:
+        component = components[n]
+        done.add(n)
+        size = len(component)
+        for k in range(size):
+            crossing, over, sign = component[(i + step * k) % size]
+            number = numbers.get(crossing)
+            if number is None:
+                number = numbers[crossing] = len(numbered) + 1
+                numbered.append(crossing)
+            if mirrored:
+                over, sign = not over, -sign
+            result += [number, 1 if over else 2, sign]
+        result.append(0)
+        while next_index < len(numbered):
+            crossing = numbered[next_index]
+            pending = [(m, j) for m, j in where[crossing] if m not in done]
+            if pending:
+                n, i = pending[0]
+                break
+            next_index += 1
+        else:
+            return tuple(result)
@@ -14,8 +14,9 @@
 #   DMS0504975 and DMS0204142.
 """
 This module exports the Crossing class, which represents a crossing
-in a link diagram, and the ECrossing class which represents an edge
-of the diagram passing through a crossing.
+in a link diagram, the ECrossing class which represents an edge
+of the diagram passing through a crossing, and the CrossingRegistry
+class which holds the crossings of a diagram.
 """
 
 
@@ -35,6 +36,11 @@ class Crossing:
         self.comp2 = None
         self.flipped = None
         self.is_virtual = is_virtual
+        self.id = None  # The position in the diagram's list of crossings.
+        # The location, sign and heights of the crossing are cached,
+        # together with the geometry of the arrows they were computed
+        # from.
+        self.located = self.signed = None
         self.locate()
         self.label = label
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                     
@@ -60,23 +66,50 @@ class Crossing:
     def __contains__(self, arrow):
         return (arrow is None or arrow == self.over or arrow == self.under)
 
+    def geometry(self):
+        """
+        The data which determine the location and sign of the crossing.
+        These change only when a vertex of one of the arrows moves, or
+        when the crossing is reversed.
+        """
+        over, under = self.over, self.under
+        return (over, under, over.geometry(), under.geometry())
+
+    def is_located(self):
+        """
+        Is the cached location of the crossing up to date?
+        """
+        return self.located == self.geometry()
+
     def locate(self):
-        t = self.over ^ self.under
+        geometry = self.geometry()
+        if geometry != self.located:
+            self.place(self.over ^ self.under, geometry)
+
+    def place(self, t, geometry=None):
+        """
+        Set the coordinates of the crossing point, given the parameter
+        t = self.over ^ self.under, which may have been computed in bulk.
+        """
         if t:
             self.x = self.over.start.x + t * self.over.dx
             self.y = self.over.start.y + t * self.over.dy
         else:
             self.x = self.y = None
+        self.t_over = t
+        self.located = geometry or self.geometry()
 
     def sign(self):
         try:
-            D = self.under.dx * self.over.dy - self.under.dy * self.over.dx
-            if D > 0:
-                return 'RH'
-            if D < 0:
-                return 'LH'
-        except:  # which exception should it catch ?
+            geometry = self.geometry()
+        except AttributeError:
             return 0
+        if geometry != self.signed:
+            D = self.under.dx * self.over.dy - self.under.dy * self.over.dx
+            self._sign = 'RH' if D > 0 else 'LH' if D < 0 else None
+            self.t_under = self.under ^ self.over
+            self.signed = geometry
+        return self._sign
 
     def strand(self, arrow):
         sign = self.sign()
@@ -93,9 +126,11 @@ class Crossing:
 
     def height(self, arrow):
         if arrow == self.under:
-            return self.under ^ self.over
+            self.sign()
+            return self.t_under
         elif arrow == self.over:
-            return self.over ^ self.under
+            self.locate()
+            return self.t_over
         else:
             return None
 
@@ -161,3 +196,140 @@ class ECrossing:
     def arr_goes_over(self, arrow):
         return (arrow == self.crossing.over)
 
+
+class CrossingRegistry:
+    """
+    The crossings of a link diagram, indexed by their (unordered)
+    pairs of arrows.  Iteration follows the order in which the
+    crossings were added, just like a list, so that codes computed
+    from the diagram do not change.  Adding, finding and removing a
+    crossing take constant time, as does finding the crossings of
+    one arrow.
+
+    A crossing is identified by its two arrows, so that, as with
+    Crossing.__eq__, a crossing can be found or removed using any
+    Crossing with the same arrows.
+
+    The id attribute of each crossing is its position in the iteration
+    order.  Removing a crossing leaves gaps, which are closed up the
+    next time an id is needed.
+    """
+
+    def __init__(self, crossings=()):
+        self.crossings = {}
+        self.by_arrow = {}
+        self.numbered = True
+        for crossing in crossings:
+            self.append(crossing)
+
+    @staticmethod
+    def _key(A, B):
+        return (A, B) if id(A) < id(B) else (B, A)
+
+    def __len__(self):
+        return len(self.crossings)
+
+    def __iter__(self):
+        return iter(list(self.crossings.values()))
+
+    def __contains__(self, crossing):
+        return self._key(crossing.over, crossing.under) in self.crossings
+
+    def __repr__(self):
+        return repr(list(self.crossings.values()))
+
+    def get(self, A, B):
+        """
+        Return the crossing of the arrows A and B, or None.
+        """
+        return self.crossings.get(self._key(A, B))
+
+    def find(self, crossing):
+        """
+        Return the registered crossing which has the same arrows as
+        the given one, or None.
+        """
+        return self.crossings.get(self._key(crossing.over, crossing.under))
+
+    def crossings_of(self, arrow):
+        """
+        Return a list of the crossings involving the arrow.
+        """
+        return list(self.by_arrow.get(arrow, ()))
+
+    def append(self, crossing):
+        """
+        Add a crossing, replacing any crossing with the same arrows.
+        """
+        key = self._key(crossing.over, crossing.under)
+        old = self.crossings.pop(key, None)
+        if old is not None:
+            self._unlink(old)
+        self.crossings[key] = crossing
+        crossing.id = len(self.crossings) - 1
+        for arrow in key:
+            arrow.crossing_cache = None
+            try:
+                self.by_arrow[arrow][crossing] = None
+            except KeyError:
+                self.by_arrow[arrow] = {crossing: None}
+
+    def remove(self, crossing):
+        """
+        Remove the crossing with the same arrows as the given one.
+        Raises ValueError if there is none.
+        """
+        old = self.crossings.pop(self._key(crossing.over, crossing.under), None)
+        if old is None:
+            raise ValueError('The crossing %s is not registered.' % crossing)
+        self._unlink(old)
+        return old
+
+    def discard(self, crossing):
+        """
+        Remove the crossing with the same arrows as the given one, if
+        there is one, and return it.
+        """
+        old = self.crossings.pop(self._key(crossing.over, crossing.under), None)
+        if old is not None:
+            self._unlink(old)
+        return old
+
+    def remove_arrow(self, arrow):
+        """
+        Remove all of the crossings involving the arrow and return a
+        list of them.
+        """
+        removed = self.crossings_of(arrow)
+        for crossing in removed:
+            self.discard(crossing)
+        return removed
+
+    def number(self, crossing):
+        """
+        Return the id of the registered crossing which has the same
+        arrows as the given one.  Raises ValueError if there is none.
+        """
+        found = self.find(crossing)
+        if found is None:
+            raise ValueError('The crossing %s is not registered.' % crossing)
+        if not self.numbered:
+            for n, c in enumerate(self.crossings.values()):
+                c.id = n
+            self.numbered = True
+        return found.id
+
+    def _unlink(self, crossing):
+        self.numbered = False
+        for arrow in (crossing.over, crossing.under):
+            arrow.crossing_cache = None
+            crossings = self.by_arrow.get(arrow)
+            if crossings is not None:
+                crossings.pop(crossing, None)
+                if not crossings:
+                    del self.by_arrow[arrow]
+
+    def clear(self):
+        self.crossings.clear()
+        self.by_arrow.clear()
+        self.numbered = True
@@ -357,10 +357,9 @@ class PLinkBase(LinkViewer):
         self.infotext_contents.set(string)
 
     def _shift(self, dx, dy):
-        for vertex in self.Vertices:
-            vertex.x += dx
-            vertex.y += dy
         self.canvas.move('transformable', dx, dy)
+        for crossing in self.translate(dx, dy):
+            crossing.under.draw(self.Crossings)
         for livearrow in (self.LiveArrow1, self.LiveArrow2):
             if livearrow:
                 x0, y0, x1, y1 = self.canvas.coords(livearrow)
@@ -437,11 +436,18 @@ class PLinkBase(LinkViewer):
         if not self._check_update():
             return
         if self.show_DT_var.get():
-            dt = self.DT_code()
-            if info_value == 6 or 3:
-                dt = self.new_DT()
-            elif info_value == 1:
-                pass
+            # The DT and alphabetical DT codes number the crossings as
+            # DT_code does.  Every other display, including none and
+            # the BB framing, shows the labels of new_DT, which the
+            # Gauss and PD codes are built from, as it always has.
+            if info_value in (1, 2):
+                dt = self.DT_code()
+            else:
+                try:
+                    dt = self.new_DT()
+                except ValueError:
+                    # A component is open, so there are no labels.
+                    dt = None
             if dt is not None:
                 self.show_DT()
         if self.show_labels_var.get():
@@ -469,7 +475,6 @@ class PLinkBase(LinkViewer):
             crossing.locate()
             yshift = 0
             for arrow in crossing.over, crossing.under:
-                arrow.vectorize()
                 if abs(arrow.dy) < .3 * abs(arrow.dx):
                     yshift = 8
             flip = ' *' if crossing.flipped else ''
@@ -491,7 +496,6 @@ class PLinkBase(LinkViewer):
             crossing.locate()
             yshift = 0
             for arrow in crossing.over, crossing.under:
-                arrow.vectorize()
                 if abs(arrow.dy) < .3 * abs(arrow.dx):
                     yshift = 6
             flip = ' *' if crossing.flipped else ''
@@ -683,16 +687,14 @@ class LinkEditor(PLinkBase):
                     x0, y0, x1, y1 = self.canvas.coords(self.LiveArrow1)
                     x0, y0 = self.ActiveVertex.point()
                     self.canvas.coords(self.LiveArrow1, x0, y0, x1, y1)
-                    self.Crossings = [c for c in self.Crossings
-                                      if last_arrow not in c]
-                    self.Vertices.remove(last_arrow.end)
-                    self.Arrows.remove(last_arrow)
+                    self.remove_vertex(last_arrow.end)
+                    self.remove_arrow(last_arrow)
                     last_arrow.end.erase()
                     last_arrow.erase()
                     for arrow in self.Arrows:
                         arrow.draw(self.Crossings)
                 if not self.ActiveVertex.in_arrow:
-                    self.Vertices.remove(self.ActiveVertex)
+                    self.remove_vertex(self.ActiveVertex)
                     self.ActiveVertex.erase()
                     self.goto_start_state()
         elif key in ('plus', 'equal'):
@@ -749,35 +751,26 @@ class LinkEditor(PLinkBase):
         Requires that all components be closed.
         """
         try:
-            crossing_components = self.crossing_components()
+            flips = self.alternating_flips()
         except ValueError:
             tkMessageBox.showwarning(
                 'Error',
                 'Please close up all components first.')
             return
-        need_flipping = set()
-
-        # properly updates original convention
-        for component in self.DT_code()[0]:
-            need_flipping.update(c for c in component if c < 0)
-
-        # may be some implementation here for new convention
-#        for component in self.DT_code():
-#            need_flipping.update(c for c in component if c < 0)
-
-        for crossing in self.Crossings:
-            if crossing.hit2 in need_flipping or crossing.hit1 in need_flipping:
-                crossing.reverse()
-
+        for crossing in flips:
+            self.reverse_crossing(crossing)
         self.clear_text()
         self.update_info()
-        for arrow in self.Arrows:
+        arrows = {}
+        for crossing in flips:
+            arrows[crossing.over] = arrows[crossing.under] = None
+        for arrow in arrows:
             arrow.draw(self.Crossings)
         self.update_smooth()
 
     def reflect(self):
         for crossing in self.Crossings:
-            crossing.reverse()
+            self.reverse_crossing(crossing)
         self.clear_text()
         self.update_info()
         for arrow in self.Arrows:
@@ -827,12 +820,11 @@ class LinkEditor(PLinkBase):
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
         self.clear_text()
-        start_vertex = Vertex(x, y, self.canvas, style='hidden')
-        if start_vertex in self.CrossPoints:
+        crossing = self.find_crossing(x, y)
+        if crossing is not None:
             # print 'shift-click in %s'%self.state
-            crossing = self.Crossings[self.CrossPoints.index(start_vertex)]
             self.update_info()
-            crossing.is_virtual = not crossing.is_virtual
+            self.toggle_virtual(crossing)
             crossing.under.draw(self.Crossings)
             crossing.over.draw(self.Crossings)
             self.update_smooth()
@@ -854,15 +846,16 @@ class LinkEditor(PLinkBase):
         self.clear_text()
         start_vertex = Vertex(x, y, self.canvas, style='hidden')
         if self.state == 'start_state':
-            if start_vertex in self.Vertices:
+            vertex = self.find_vertex(x, y)
+            crossing = self.find_crossing(x, y)
+            if vertex is not None:
                 # print 'single click on a vertex'
                 self.state = 'dragging_state'
                 self.hide_DT()
                 self.hide_labels()
                 self.update_info()
                 self.canvas.config(cursor=closed_hand_cursor)
-                self.ActiveVertex = self.Vertices[
-                    self.Vertices.index(start_vertex)]
+                self.ActiveVertex = vertex
                 self.ActiveVertex.freeze()
                 self.saved_crossing_data = self.active_crossing_data()
                 x1, y1 = self.ActiveVertex.point()
@@ -884,13 +877,12 @@ class LinkEditor(PLinkBase):
                 return
             elif self.lock_var.get():
                 return
-            elif start_vertex in self.CrossPoints:
+            elif crossing is not None:
                 # print 'single click on a crossing'
-                crossing = self.Crossings[self.CrossPoints.index(start_vertex)]
                 if crossing.is_virtual:
-                    crossing.is_virtual = False
+                    self.toggle_virtual(crossing)
                 else:
-                    crossing.reverse()
+                    self.reverse_crossing(crossing)
                 self.update_info()
                 crossing.under.draw(self.Crossings)
                 crossing.over.draw(self.Crossings)
@@ -907,7 +899,7 @@ class LinkEditor(PLinkBase):
                     return
             x1, y1 = start_vertex.point()
             start_vertex.set_color(self.palette.new())
-            self.Vertices.append(start_vertex)
+            self.add_vertex(start_vertex)
             self.ActiveVertex = start_vertex
             self.goto_drawing_state(x1, y1)
             return
@@ -933,19 +925,21 @@ class LinkEditor(PLinkBase):
                 next_arrow = Arrow(self.ActiveVertex, next_vertex,
                                    self.canvas, style='hidden',
                                    color=this_color)
-                self.Arrows.append(next_arrow)
+                self.add_arrow(next_arrow)
             next_vertex.set_color(next_arrow.color)
-            if next_vertex in [v for v in self.Vertices if v.is_endpoint()]:
+            endpoint = self.find_vertex(x, y, lambda v: v.is_endpoint())
+            if endpoint is not None:
                 # print 'melding vertices'
                 if not self.generic_arrow(next_arrow):
                     self.alert()
                     return
                 next_vertex.erase()
-                next_vertex = self.Vertices[self.Vertices.index(next_vertex)]
+                next_vertex = endpoint
                 if next_vertex.in_arrow:
-                    next_vertex.reverse_path()
+                    self.reverse_path(next_vertex)
                 next_arrow.set_end(next_vertex)
                 next_vertex.in_arrow = next_arrow
+                self.changed(topology=True)
                 if next_vertex.color != self.ActiveVertex.color:
                     self.palette.recycle(self.ActiveVertex.color)
                     next_vertex.recolor_incoming(color=next_vertex.color)
@@ -962,7 +956,7 @@ class LinkEditor(PLinkBase):
             self.update_crossings(next_arrow)
             self.update_crosspoints()
             next_arrow.expose(self.Crossings)
-            self.Vertices.append(next_vertex)
+            self.add_vertex(next_vertex)
             next_vertex.expose()
             self.ActiveVertex = next_vertex
             self.canvas.coords(self.LiveArrow1, x, y, x, y)
@@ -993,20 +987,22 @@ class LinkEditor(PLinkBase):
                 self.alert()
                 return
             # The first click on a vertex put us in dragging state.
-            if vertex in [v for v in self.Vertices if v.is_endpoint()]:
+            endpoint = self.find_vertex(x, y, lambda v: v.is_endpoint())
+            cut_vertex = self.find_vertex(x, y)
+            if endpoint is not None:
                 # print 'double-clicked on an endpoint'
                 vertex.erase()
-                vertex = self.Vertices[self.Vertices.index(vertex)]
+                vertex = endpoint
                 x0, y0 = x1, y1 = vertex.point()
                 if vertex.out_arrow:
                     self.update_crosspoints()
-                    vertex.reverse_path()
-            elif vertex in self.Vertices:
+                    self.reverse_path(vertex)
+            elif cut_vertex is not None:
                 # print 'double-clicked on a non-endpoint vertex'
-                cut_vertex = self.Vertices[self.Vertices.index(vertex)]
                 cut_vertex.recolor_incoming(palette=self.palette)
                 cut_arrow = cut_vertex.in_arrow
                 cut_vertex.in_arrow = None
+                self.changed(topology=True)
                 vertex = cut_arrow.start
                 x1, y1 = cut_vertex.point()
                 cut_arrow.freeze()
@@ -1023,21 +1019,21 @@ class LinkEditor(PLinkBase):
     def set_start_cursor(self, x, y):
         point = Vertex(x, y, self.canvas, style='hidden')
         if self.shift_down:
-            if point in self.CrossPoints:
+            if self.find_crossing(x, y) is not None:
                 self.canvas.config(cursor='dot')
             else:
                 self.canvas.config(cursor='')
         elif self.lock_var.get():
-            if point in self.Vertices:
+            if self.find_vertex(x, y) is not None:
                 self.flipcheck = None
                 self.canvas.config(cursor=open_hand_cursor)
             else:
                 self.canvas.config(cursor='')
         else:
-            if point in self.Vertices:
+            if self.find_vertex(x, y) is not None:
                 self.flipcheck = None
                 self.canvas.config(cursor=open_hand_cursor)
-            elif point in self.CrossPoints:
+            elif self.find_crossing(x, y) is not None:
                 self.flipcheck = None
                 self.canvas.config(cursor='exchange')
             elif self.cursor_on_arrow(point):
@@ -1085,7 +1081,24 @@ class LinkEditor(PLinkBase):
                 self.crossed_arrows(active.out_arrow, ignore))
 
     def move_is_ok(self):
-        return self.active_crossing_data() == self.saved_crossing_data
+        """
+        Check that the in and out arrows of the active vertex still
+        cross the same arrows, in the same order, as when the drag
+        began.  Only the arrows near the two arrows are examined.
+        """
+        active = self.ActiveVertex
+        in_arrow, out_arrow = active.in_arrow, active.out_arrow
+        X, Y = [active.x], [active.y]
+        for arrow in in_arrow, out_arrow:
+            if arrow:
+                X += [arrow.start.x, arrow.end.x]
+                Y += [arrow.start.y, arrow.end.y]
+        candidates = self.ArrowGrid.query(min(X), min(Y), max(X), max(Y))
+        ignore = [in_arrow, out_arrow]
+        for arrow, saved in zip(ignore, self.saved_crossing_data):
+            if self.crossed_arrows(arrow, ignore, candidates) != saved:
+                return False
+        return True
 
     def move_active(self, x, y):
         active = self.ActiveVertex
@@ -1122,6 +1135,7 @@ class LinkEditor(PLinkBase):
             self.canvas.delete('lock_error')
         else:
             active.x, active.y = float(x), float(y)
+        self.index_vertex(active)
         self.ActiveVertex.draw()
         if self.LiveArrow1:
             x0, y0, x1, y1 = self.canvas.coords(self.LiveArrow1)
@@ -1164,9 +1178,9 @@ class LinkEditor(PLinkBase):
             self.shift_stamp = now
 
     def clicked_on_arrow(self, vertex):
-        for arrow in self.Arrows:
+        for arrow in self.arrows_near(vertex.x, vertex.y, Arrow.epsilon):
             if arrow.too_close(vertex):
-                arrow.end.reverse_path(self.Crossings)
+                self.reverse_path(arrow.end, self.Crossings)
                 self.update_info()
                 return True
         return False
@@ -1174,10 +1188,7 @@ class LinkEditor(PLinkBase):
     def cursor_on_arrow(self, point):
         if self.lock_var.get():
             return False
-        for arrow in self.Arrows:
-            if arrow.too_close(point):
-                return True
-        return False
+        return self.arrow_near_point(point) is not None
 
     def goto_start_state(self):
         self.canvas.delete("lock_error")
@@ -1206,9 +1217,10 @@ class LinkEditor(PLinkBase):
     def verify_drag(self):
         active = self.ActiveVertex
         active.update_arrows()
+        # Only the crossings of the two arrows at the active vertex can
+        # change, and update_crossings relocates them.
         self.update_crossings(active.in_arrow)
         self.update_crossings(active.out_arrow)
-        self.update_crosspoints()
         return (self.generic_arrow(active.in_arrow) and
                 self.generic_arrow(active.out_arrow))
 
@@ -1221,14 +1233,16 @@ class LinkEditor(PLinkBase):
         else:
             x, y = float(self.cursorx), float(self.cursory)
             self.ActiveVertex.x, self.ActiveVertex.y = x, y
+            self.index_vertex(self.ActiveVertex)
         endpoint = None
         if self.ActiveVertex.is_endpoint():
-            other_ends = [v for v in self.Vertices if
-                          v.is_endpoint() and v is not self.ActiveVertex]
-            if self.ActiveVertex in other_ends:
-                endpoint = other_ends[other_ends.index(self.ActiveVertex)]
+            active = self.ActiveVertex
+            endpoint = self.find_vertex(
+                active.x, active.y,
+                lambda v: v.is_endpoint() and v is not active)
+            if endpoint is not None:
                 self.ActiveVertex.swallow(endpoint, self.palette)
-                self.Vertices = [v for v in self.Vertices if v is not endpoint]
+                self.remove_vertex(endpoint)
             self.update_crossings(self.ActiveVertex.in_arrow)
             self.update_crossings(self.ActiveVertex.out_arrow)
         if endpoint is None and not self.generic_vertex(self.ActiveVertex):
@@ -1242,49 +1256,38 @@ class LinkEditor(PLinkBase):
         self.goto_start_state()
 
     def generic_vertex(self, vertex):
-        if vertex in [v for v in self.Vertices if v is not vertex]:
+        if self.find_vertex(vertex.x, vertex.y,
+                            lambda v: v is not vertex) is not None:
+            return False
+        if self.arrow_near_point(vertex, tolerance=Arrow.epsilon + 2):
+            # print 'non-generic vertex'
             return False
-        for arrow in self.Arrows:
-            if arrow.too_close(vertex, tolerance=Arrow.epsilon + 2):
-                # print 'non-generic vertex'
-                return False
         return True
 
     def generic_arrow(self, arrow):
         if arrow == None:
             return True
-        locked = self.lock_var.get()
-        for vertex in self.Vertices:
-            if arrow.too_close(vertex):
-                if locked:
-                    x, y, delta = vertex.x, vertex.y, 6
-                    self.canvas.delete('lock_error')
-                    self.canvas.create_oval(x - delta, y - delta, x + delta, y + delta,
-                                            outline='gray', fill=None, width=3,
-                                            tags='lock_error')
-                # print 'arrow too close to vertex %s'%vertex
-                return False
-        for crossing in self.Crossings:
-            point = self.CrossPoints[self.Crossings.index(crossing)]
-            if arrow not in crossing and arrow.too_close(point):
-                if locked:
-                    x, y, delta = point.x, point.y, 6
-                    self.canvas.delete('lock_error')
-                    self.canvas.create_oval(x - delta, y - delta, x + delta, y + delta,
-                                            outline='gray', fill=None, width=3,
-                                            tags='lock_error')
-                # print 'arrow too close to crossing %s'%crossing
-                return False
-        return True
+        point = self.vertex_near_arrow(arrow)
+        if point is None:
+            point = self.crossing_near_arrow(arrow)
+        if point is None:
+            return True
+        # print 'arrow too close to vertex or crossing %s'%point
+        if self.lock_var.get():
+            x, y, delta = point.x, point.y, 6
+            self.canvas.delete('lock_error')
+            self.canvas.create_oval(x - delta, y - delta, x + delta, y + delta,
+                                    outline='gray', fill=None, width=3,
+                                    tags='lock_error')
+        return False
 
     def destroy_arrow(self, arrow):
-        self.Arrows.remove(arrow)
+        self.remove_arrow(arrow)
         if arrow.end:
             arrow.end.in_arrow = None
         if arrow.start:
             arrow.start.out_arrow = None
         arrow.erase()
-        self.Crossings = [c for c in self.Crossings if arrow not in c]
 
     def update_crossings(self, this_arrow):
         """
@@ -1292,44 +1295,57 @@ class LinkEditor(PLinkBase):
         """
         if this_arrow == None:
             return
-        cross_list = [c for c in self.Crossings if this_arrow in c]
+        self.index_arrow(this_arrow)
+        cross_list = self.Crossings.crossings_of(this_arrow)
         damage_list = []
-        find = lambda x: cross_list[cross_list.index(x)]
-        for arrow in self.Arrows:
-            if this_arrow == arrow:
-                continue
-            new_crossing = Crossing(this_arrow, arrow)
-            new_crossing.locate()
-            if new_crossing.x != None:
-                if new_crossing in cross_list:
-                    # print 'keeping %s'%new_crossing
-                    find(new_crossing).locate()
-                    continue
-                else:
+        candidates = self.crossing_candidates(this_arrow)
+        # An arrow which does not share a grid cell with this_arrow
+        # cannot cross it, so any crossing with such an arrow is gone.
+        nearby = set(candidates)
+        for crossing in cross_list:
+            arrow = crossing.under if crossing.over is this_arrow else crossing.over
+            if arrow not in nearby:
+                if arrow == crossing.under:
+                    damage_list.append(arrow)
+                self.remove_crossing(crossing)
+        for arrow in candidates:
+            crossing = self.Crossings.get(this_arrow, arrow)
+            if crossing is None:
+                new_crossing = Crossing(this_arrow, arrow)
+                if new_crossing.x != None:
                     # print 'adding %s'%new_crossing
-                    self.Crossings.append(new_crossing)
+                    self.add_crossing(new_crossing)
+                continue
+            crossing.locate()
+            if crossing.x != None:
+                # print 'keeping %s'%crossing
+                self.index_crossing(crossing)
             else:
-                # print 'removing %s'%new_crossing
-                if new_crossing in self.Crossings:
-                    if arrow == find(new_crossing).under:
-                        damage_list.append(arrow)
-                    self.Crossings.remove(new_crossing)
+                # print 'removing %s'%crossing
+                if arrow == crossing.under:
+                    damage_list.append(arrow)
+                self.remove_crossing(crossing)
         for arrow in damage_list:
             arrow.draw(self.Crossings)
 
-    def crossed_arrows(self, arrow, ignore_list=[]):
+    def crossed_arrows(self, arrow, ignore_list=[], candidates=None):
         """
         Return a tuple containing the arrows of the diagram which are
         crossed by the given arrow, in order along the given arrow.
+        If a list of candidates is given, it must contain every arrow
+        which might cross the given one.
         """
         if arrow is None:
             return tuple()
         arrow.vectorize()
+        if candidates is None:
+            candidates = self.crossing_candidates(arrow)
         crosslist = []
-        for n, diagram_arrow in enumerate(self.Arrows):
-            if arrow == diagram_arrow or diagram_arrow in ignore_list:
+        for diagram_arrow in candidates:
+            if diagram_arrow is arrow or diagram_arrow in ignore_list:
                 continue
             t = arrow ^ diagram_arrow
             if t is not None:
-                crosslist.append((t, n))
-        return tuple(n for _, n in sorted(crosslist))
+                crosslist.append((t, diagram_arrow))
+        crosslist.sort(key=lambda x: x[0])
+        return tuple(a for _, a in crosslist)
@@ -0,0 +1,254 @@
+#
+#   Copyright (C) 2007-present Marc Culler, Nathan Dunfield and others.
+#
+#   This program is distributed under the terms of the
+#   GNU General Public License, version 2 or later, as published by
+#   the Free Software Foundation.  See the file gpl-2.0.txt for details.
+#   The URL for this program is
+#     http://www.math.uic.edu/~t3m/plink
+#   A copy of the license file may be found at:
+#     http://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+#
+#   The development of this program was partially supported by
+#   the National Science Foundation under grants DMS0608567,
+#   DMS0504975 and DMS0204142.
+"""
+This module exports the functions pair_parameters, all_crossings and
+sweep_crossings, which compute the intersection parameters of many
+arrows at once.
+
+When NumPy is available the endpoints of the arrows are copied into
+contiguous float64 arrays and the parameters are computed a block of
+pairs at a time.  The arithmetic is done in the same order as in
+Arrow.__xor__, so the results agree with it exactly.  Without NumPy
+the same functions fall back to pure Python.
+
+The function sweep_crossings finds all k crossings among n arrows by a
+Bentley-Ottmann sweep, in time O((n + k) log n), using no arrays.
+"""
+from heapq import heappush, heappop
+from math import cos, sin
+from spatial import SegmentGrid
+
+try:
+    import numpy
+    have_numpy = True
+except ImportError:
+    have_numpy = False
+
+# The largest number of pairs of arrows handled by one block of array
+# operations.  Each block needs a dozen or so temporary arrays of this
+# many float64s.
+block_size = 1 << 18
+
+
+def segment_arrays(arrows):
+    """
+    Return arrays containing the x and y coordinates of the start
+    vertices of the given (vectorized) arrows, and their components
+    dx and dy.
+    """
+    x = numpy.array([arrow.start.x for arrow in arrows], dtype=numpy.float64)
+    y = numpy.array([arrow.start.y for arrow in arrows], dtype=numpy.float64)
+    dx = numpy.array([arrow.dx for arrow in arrows], dtype=numpy.float64)
+    dy = numpy.array([arrow.dy for arrow in arrows], dtype=numpy.float64)
+    return x, y, dx, dy
+
+
+def _parameters(x1, y1, dx1, dy1, x2, y2, dx2, dy2):
+    """
+    Compute, elementwise, the parameters s and t at which the first
+    segments cross the second segments, as in Arrow.__xor__, along
+    with a boolean array which is True where they actually cross.
+    """
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        D = dx2 * dy1 - dx1 * dy2
+        xx = x2 - x1
+        yy = y2 - y1
+        s = (yy * dx1 - xx * dy1) / D
+        t = (yy * dx2 - xx * dy2) / D
+        hit = (D != 0) & (0 < s) & (s < 1) & (0 < t) & (t < 1)
+    return s, t, hit
+
+
+def pair_parameters(pairs):
+    """
+    Given a list of pairs (A, B) of vectorized arrows, return the list
+    of the values A ^ B.
+    """
+    if not have_numpy or len(pairs) < 16:
+        return [A ^ B for A, B in pairs]
+    result = []
+    for n in range(0, len(pairs), block_size):
+        block = pairs[n:n + block_size]
+        x1, y1, dx1, dy1 = segment_arrays([A for A, B in block])
+        x2, y2, dx2, dy2 = segment_arrays([B for A, B in block])
+        s, t, hit = _parameters(x1, y1, dx1, dy1, x2, y2, dx2, dy2)
+        result += [T if H else None for T, H in zip(t.tolist(), hit.tolist())]
+    return result
+
+
+def all_crossings(arrows):
+    """
+    Find every pair of the given vectorized arrows which cross.
+    Returns a list of quadruples (i, j, t, s) with i < j, where
+    t = arrows[i] ^ arrows[j] and s = arrows[j] ^ arrows[i].
+    """
+    arrows = list(arrows)
+    if have_numpy:
+        return _all_crossings_numpy(arrows)
+    return _all_crossings_python(arrows)
+
+
+def _all_crossings_numpy(arrows):
+    n = len(arrows)
+    if n < 2:
+        return []
+    x, y, dx, dy = segment_arrays(arrows)
+    rows = max(1, block_size // n)
+    result = []
+    for a in range(0, n - 1, rows):
+        b = min(a + rows, n - 1)
+        # Compare arrows a, ..., b-1 with the arrows after arrow a.
+        i = numpy.arange(a, b)[:, None]
+        j = numpy.arange(a + 1, n)[None, :]
+        s, t, hit = _parameters(x[a:b, None], y[a:b, None],
+                                dx[a:b, None], dy[a:b, None],
+                                x[None, a + 1:], y[None, a + 1:],
+                                dx[None, a + 1:], dy[None, a + 1:])
+        hit &= j > i
+        I, J = numpy.nonzero(hit)
+        result += zip((I + a).tolist(), (J + a + 1).tolist(),
+                      t[I, J].tolist(), s[I, J].tolist())
+    return result
+
+
+def _all_crossings_python(arrows):
+    # Only arrows with overlapping bounding boxes can cross, and those
+    # always share a cell of a SegmentGrid.
+    grid = SegmentGrid()
+    grid.rebuild((n, A.start.x, A.start.y, A.end.x, A.end.y)
+                 for n, A in enumerate(arrows))
+    result = []
+    for i, A in enumerate(arrows):
+        for j in sorted(grid.query(A.start.x, A.start.y, A.end.x, A.end.y)):
+            if j > i:
+                B = arrows[j]
+                t = A ^ B
+                if t:
+                    result.append((i, j, t, B ^ A))
+    return result
+
+
+# The sweep is done in coordinates rotated by this angle, so that the
+# vertical arrows and the many vertices with equal integer coordinates
+# in a typical diagram do not produce ties.
+sweep_angle = 0.4142
+
+
+def sweep_crossings(arrows):
+    """
+    Find every pair of the given vectorized arrows which cross, by
+    sweeping a line across the diagram.  Returns the same quadruples
+    as all_crossings, in the same order.
+
+    The sweep only decides which pairs to test; each pair is tested
+    with Arrow.__xor__, so the answer does not depend on round-off in
+    the rotated coordinates.  Arrows which share a vertex are never
+    considered to cross.
+    """
+    arrows = list(arrows)
+    c, s = cos(sweep_angle), sin(sweep_angle)
+    # Each arrow becomes a segment with left end (X0, Y0) and slope M
+    # in the rotated coordinates.
+    X0, Y0, M = [], [], []
+    events, scale = [], 1.0
+    for n, A in enumerate(arrows):
+        ax, ay = c * A.start.x - s * A.start.y, s * A.start.x + c * A.start.y
+        bx, by = c * A.end.x - s * A.end.y, s * A.end.x + c * A.end.y
+        if bx < ax:
+            ax, ay, bx, by = bx, by, ax, ay
+        X0.append(ax)
+        Y0.append(ay)
+        M.append((by - ay) / (bx - ax) if bx != ax else 0.0)
+        scale = max(scale, abs(ax), abs(ay), abs(bx), abs(by))
+        # At equal x, segments are removed first, then swapped, then
+        # inserted.  A segment which is vertical even after rotation is
+        # removed after it has been inserted.
+        heappush(events, (ax, 2, n, n))
+        heappush(events, (bx, 0 if bx > ax else 3, n, n))
+    # Heights closer than this are treated as equal, and the segments
+    # are ordered by slope, as they are just to the right of x.
+    epsilon = 1e-9 * scale
+
+    def below(m, n, x):
+        ym, yn = Y0[m] + M[m] * (x - X0[m]), Y0[n] + M[n] * (x - X0[n])
+        if abs(ym - yn) > epsilon:
+            return ym < yn
+        return M[m] < M[n]
+
+    status, active, swapped, found = [], set(), set(), {}
+
+    def position(n, x):
+        # Binary search for the place of segment n in the status list,
+        # followed by a local search to allow for round-off.
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if below(status[mid], n, x):
+                lo = mid + 1
+            else:
+                hi = mid
+        if n in active:
+            for d in range(len(status)):
+                for p in (lo + d, lo - d - 1):
+                    if 0 <= p < len(status) and status[p] == n:
+                        return p
+        return lo
+
+    def check(p):
+        # Test the adjacent segments at positions p and p + 1.  If they
+        # cross, record it and, if they have yet to swap, schedule the
+        # swap at the crossing point.
+        if p < 0 or p + 1 >= len(status):
+            return
+        a, b = status[p], status[p + 1]
+        A, B = arrows[a], arrows[b]
+        if (A.start is B.start or A.start is B.end or
+                A.end is B.start or A.end is B.end):
+            return
+        i, j = (a, b) if a < b else (b, a)
+        if (i, j) in found:
+            t = found[i, j]
+        else:
+            t = found[i, j] = arrows[i] ^ arrows[j]
+        if t and M[a] > M[b] and (a, b) not in swapped:
+            I = arrows[i]
+            x, y = I.start.x + t * I.dx, I.start.y + t * I.dy
+            heappush(events, (c * x - s * y, 1, a, b))
+
+    while events:
+        x, kind, a, b = heappop(events)
+        if kind == 2:
+            p = position(a, x)
+            status.insert(p, a)
+            active.add(a)
+            check(p - 1)
+            check(p)
+        elif kind != 1:
+            p = position(a, x)
+            del status[p]
+            active.discard(a)
+            check(p - 1)
+        else:
+            if a not in active or b not in active or (a, b) in swapped:
+                continue
+            p = position(a, x)
+            if p + 1 >= len(status) or status[p + 1] != b:
+                continue
+            status[p], status[p + 1] = b, a
+            swapped.add((a, b))
+            check(p - 1)
+            check(p + 1)
+    return sorted((i, j, t, arrows[j] ^ arrows[i])
+                  for (i, j), t in found.items() if t)
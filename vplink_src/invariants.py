@@ -0,0 +1,751 @@
+#
+#   Copyright (C) 2007-present Marc Culler, Nathan Dunfield and others.
+#
+#   This program is distributed under the terms of the
+#   GNU General Public License, version 2 or later, as published by
+#   the Free Software Foundation.  See the file gpl-2.0.txt for details.
+#   The URL for this program is
+#     http://www.math.uic.edu/~t3m/plink
+#   A copy of the license file may be found at:
+#     http://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+#
+#   The development of this program was partially supported by
+#   the National Science Foundation under grants DMS0608567,
+#   DMS0504975 and DMS0204142.
+"""
+This module exports functions which compute invariants of a link
+from the combinatorics of a diagram: the Goeritz matrices of a
+PlanarMap, and the determinant and signature of a link computed from
+them; the Alexander polynomial, computed from the Wirtinger
+presentation of the link group; and the Kauffman bracket and Jones
+polynomial, which are also defined for virtual links.
+
+When NumPy is available the eliminations are done a row block at a
+time, on arrays of Python integers for the Goeritz matrices, so they
+are exact, and on int64 arrays modulo primes for the Alexander
+polynomial.  Without NumPy the same functions fall back to lists.
+"""
+
+import multiprocessing
+from itertools import product
+
+try:
+    import numpy
+    have_numpy = True
+except ImportError:
+    have_numpy = False
+
+
+def goeritz_matrices(planar_map):
+    """
+    Return a list with one entry for each connected piece of a
+    classical diagram, given as a PlanarMap.  Each entry is a pair (G,
+    mu), where G is a Goeritz matrix of the piece, as a list of lists
+    of integers, and mu is the Gordon-Litherland correction term.
+
+    The faces of each piece are colored like a checkerboard, and the
+    Goeritz matrix is built from the regions of the color with fewer
+    faces, leaving out one of them.  At a crossing c where those
+    regions meet in the corners i and j, eta(c) = -1 if the overstrand
+    turns counterclockwise through these corners and 1 otherwise, and
+    G has -eta(c) added to its (i, j) and (j, i) entries and eta(c)
+    added to its (i, i) and (j, j) entries.  A crossing is of type II
+    when the corners of the other color lie between the two strands
+    leaving the crossing and between the two arriving, and mu is the
+    sum of eta(c) over the crossings of type II.  Then, by the theorem
+    of Gordon and Litherland, the signature of the link is the
+    signature of G minus mu, and its determinant is |det G|.
+    """
+    colors = planar_map.face_colors()
+    if colors is None:
+        raise ValueError('The diagram has no checkerboard coloring.')
+    faces, at, face = planar_map.faces, planar_map.at, planar_map.face
+    # Group the faces and crossings into connected pieces.
+    piece_of_face = [None] * len(faces)
+    pieces = []
+    for start in range(len(faces)):
+        if piece_of_face[start] is not None:
+            continue
+        piece_of_face[start], stack = len(pieces), [start]
+        members = [start]
+        while stack:
+            f = stack.pop()
+            for h in faces[f]:
+                g = face[h ^ 1]
+                if piece_of_face[g] is None:
+                    piece_of_face[g] = len(pieces)
+                    stack.append(g)
+                    members.append(g)
+        pieces.append(members)
+    crossings_of = [[] for piece in pieces]
+    for v in range(len(planar_map.crossings)):
+        crossings_of[piece_of_face[face[at[4 * v]]]].append(v)
+    result = []
+    for members, vertices in zip(pieces, crossings_of):
+        counts = [0, 0]
+        for f in members:
+            counts[colors[f]] += 1
+        white = 0 if counts[0] <= counts[1] else 1
+        regions = [f for f in members if colors[f] == white]
+        number = {f: n for n, f in enumerate(regions)}
+        size = len(regions)
+        G = [[0] * size for n in range(size)]
+        mu = 0
+        for v in vertices:
+            # The face in the corner between the half-edges in
+            # positions k and k + 1 at the crossing.
+            corner = [face[at[4 * v + (k + 1) % 4]] for k in range(4)]
+            first = 0 if colors[corner[0]] == white else 1
+            crossing = planar_map.crossings[v]
+            # The overstrand is the X strand of a right handed crossing,
+            # and turning it counterclockwise sweeps the corners 0 and 2.
+            over_first = 0 if crossing.sign() == 'RH' else 1
+            eta = -1 if first == over_first else 1
+            if first == 1:
+                mu += eta
+            i, j = number[corner[first]], number[corner[first + 2]]
+            if i != j:
+                G[i][j] -= eta
+                G[j][i] -= eta
+                G[i][i] += eta
+                G[j][j] += eta
+        result.append(([row[:-1] for row in G[:-1]], mu))
+    return result
+
+
+def symmetric_bareiss(matrix):
+    """
+    Reduce a symmetric integer matrix by fraction-free (Bareiss)
+    elimination, choosing pivots on the diagonal.  When every
+    remaining diagonal entry is zero, a row and column are added to
+    another row and column, which does not change the signature.
+    Returns (pivots, nullity), where pivots is the list of the leading
+    principal minors M_1, M_2, ... of the transformed matrix, which
+    are all nonzero, and nullity is the dimension of its kernel.  The
+    determinant is M_n if the nullity is 0, and the signature is the
+    number of positive ratios M_k / M_(k-1) minus the number of
+    negative ones, where M_0 = 1.
+    """
+    n = len(matrix)
+    if have_numpy:
+        A = numpy.empty((n, n), dtype=object)
+        A[:, :] = [list(row) for row in matrix]
+    else:
+        A = [list(row) for row in matrix]
+    pivots, previous = [], 1
+    for k in range(n):
+        p = next((i for i in range(k, n) if A[i][i] != 0), None)
+        if p is None:
+            pair = next(((i, j) for i in range(k, n) for j in range(i + 1, n)
+                         if A[i][j] != 0), None)
+            if pair is None:
+                return pivots, n - k
+            i, j = pair
+            # Now A[i][i] = 2 * A[i][j], which is not zero.
+            _add(A, i, j)
+            p = i
+        _swap(A, k, p)
+        pivot = A[k][k]
+        if have_numpy:
+            block = A[k + 1:, k + 1:]
+            block *= pivot
+            block -= numpy.outer(A[k + 1:, k], A[k, k + 1:])
+            A[k + 1:, k + 1:] = block // previous
+            A[k + 1:, k] = 0
+            A[k, k + 1:] = 0
+        else:
+            row_k = A[k]
+            for i in range(k + 1, n):
+                row_i, a = A[i], A[i][k]
+                for j in range(k + 1, n):
+                    row_i[j] = (pivot * row_i[j] - a * row_k[j]) // previous
+                row_i[k] = 0
+            for j in range(k + 1, n):
+                row_k[j] = 0
+        pivots.append(pivot)
+        previous = pivot
+    return pivots, 0
+
+
+def _add(A, i, j):
+    # Add row and column j to row and column i.
+    if have_numpy:
+        A[i, :] += A[j, :]
+        A[:, i] += A[:, j]
+    else:
+        A[i] = [a + b for a, b in zip(A[i], A[j])]
+        for row in A:
+            row[i] += row[j]
+
+
+def _swap(A, i, j):
+    # Exchange rows and columns i and j.
+    if i == j:
+        return
+    if have_numpy:
+        A[[i, j], :] = A[[j, i], :]
+        A[:, [i, j]] = A[:, [j, i]]
+    else:
+        A[i], A[j] = A[j], A[i]
+        for row in A:
+            row[i], row[j] = row[j], row[i]
+
+
+def signature_and_determinant(matrix):
+    """
+    Return the signature and the absolute value of the determinant of
+    a symmetric integer matrix.
+    """
+    pivots, nullity = symmetric_bareiss(matrix)
+    signature, previous = 0, 1
+    for pivot in pivots:
+        signature += 1 if (pivot > 0) == (previous > 0) else -1
+        previous = pivot
+    determinant = 0 if nullity else abs(pivots[-1]) if pivots else 1
+    return signature, determinant
+
+
+def wirtinger_relations(components):
+    """
+    The argument is a list of crossing components, as returned by
+    LinkManager.crossing_components, with no virtual crossings.  The
+    arcs of the diagram, which run from one undercrossing to the next,
+    are the generators of the Wirtinger presentation of the link
+    group.  Returns (num_arcs, relations), where relations contains a
+    tuple (over, before, after, sign) for each crossing: the arc going
+    over the crossing, the arcs which arrive at and leave the crossing
+    underneath, and 1 or -1 for a right or left handed crossing.  The
+    arcs of each component are numbered consecutively, and a component
+    with no undercrossings is a single arc.
+    """
+    num_arcs, overs, unders = 0, {}, {}
+    for component in components:
+        below = [i for i, ec in enumerate(component) if ec.goes_under()]
+        if not below:
+            for ec in component:
+                overs[ec.crossing] = num_arcs
+            num_arcs += 1
+            continue
+        # Passage i lies on the arc which starts at the last
+        # undercrossing before it.
+        arc = num_arcs + len(below) - 1
+        for i, ec in enumerate(component):
+            if ec.goes_under():
+                before = arc
+                arc = num_arcs + below.index(i)
+                unders[ec.crossing] = (before, arc)
+            else:
+                overs[ec.crossing] = arc
+        num_arcs += len(below)
+    relations = []
+    for crossing, (before, after) in unders.items():
+        sign = 1 if crossing.sign() == 'RH' else -1
+        relations.append((overs[crossing], before, after, sign))
+    return num_arcs, relations
+
+
+def alexander_matrix(num_arcs, relations):
+    """
+    Return the Alexander matrix of a Wirtinger presentation, the
+    matrix of Fox derivatives of the relations with every generator
+    sent to t.  It is sparse, so each row is a dict which maps a
+    column to the entry (a, b), meaning a + b*t.  The relation at a
+    right handed crossing, where an arc passes under the arc x from z
+    to w, is w = x z x^-1, with derivatives 1 - t, t and -1 by x, z
+    and w; at a left handed crossing it is w = x^-1 z x, whose
+    derivatives, multiplied by -t, are 1 - t, -1 and t.
+    """
+    rows = []
+    for over, before, after, sign in relations:
+        row = {}
+        if sign > 0:
+            entries = ((over, 1, -1), (before, 0, 1), (after, -1, 0))
+        else:
+            entries = ((over, 1, -1), (before, -1, 0), (after, 0, 1))
+        for column, a, b in entries:
+            a0, b0 = row.get(column, (0, 0))
+            row[column] = (a0 + a, b0 + b)
+        rows.append(row)
+    return rows
+
+
+def alexander_polynomial(num_arcs, relations):
+    """
+    Return the Alexander polynomial of a link which has a connected
+    diagram with the given Wirtinger presentation, as a list of
+    integer coefficients starting with the constant term.  It is
+    normalized so that the constant term is not zero and the leading
+    coefficient is positive.  The trefoil gives [1, -1, 1].
+
+    The polynomial is the determinant of the Alexander matrix with its
+    first row and column removed, which has degree at most n = the
+    number of crossings minus 1.  Rather than expanding the
+    determinant symbolically, its coefficients are computed modulo
+    primes p < 2^31 and recovered by the Chinese remainder theorem,
+    taking residues in the symmetric range.  Primes are added until
+    one more prime leaves the result unchanged, or until their product
+    exceeds twice the bound on the coefficients from Hadamard's
+    inequality, whichever comes first.  The coefficients are usually
+    far smaller than the bound: those of the torus knot T(2, 101) are
+    all 1 or -1, so it needs two primes where the bound asks for five.
+    """
+    rows = alexander_matrix(num_arcs, relations)
+    if len(rows) != num_arcs:
+        # A component with no undercrossings lies above the rest of
+        # the diagram, so the link splits.
+        return [0]
+    minor = [{column - 1: entry for column, entry in row.items() if column}
+             for row in rows[1:]]
+    # Each coefficient is at most the maximum of the determinant on
+    # the unit circle, which by Hadamard's inequality is at most the
+    # product of the lengths of the rows there.  Keep its square.
+    bound = 1
+    for row in minor:
+        bound *= sum((abs(a) + abs(b))**2 for a, b in row.values())
+    residues, modulus, previous = [0] * (len(minor) + 1), 1, None
+    for p in _primes():
+        values = _determinant_polynomial(minor, p)
+        # Combine the coefficients modulo the primes so far with the
+        # new residues.
+        inverse = pow(modulus % p, p - 2, p)
+        residues = [c + modulus * ((r - c) * inverse % p)
+                    for c, r in zip(residues, values)]
+        modulus *= p
+        coefficients = [c - modulus if 2 * c > modulus else c
+                        for c in residues]
+        if coefficients == previous or modulus**2 > 4 * bound:
+            break
+        previous = coefficients
+    while coefficients and coefficients[-1] == 0:
+        coefficients.pop()
+    while coefficients and coefficients[0] == 0:
+        coefficients.pop(0)
+    if not coefficients:
+        return [0]
+    if coefficients[-1] < 0:
+        coefficients = [-c for c in coefficients]
+    return coefficients
+
+
+def _primes():
+    # Generate the primes below 2^31, largest first.
+    limit = 46341  # The smallest integer whose square exceeds 2^31.
+    sieve = bytearray([1]) * limit
+    sieve[0] = sieve[1] = 0
+    for n in range(2, 216):
+        if sieve[n]:
+            sieve[n * n::n] = bytearray(len(range(n * n, limit, n)))
+    small = [n for n in range(limit) if sieve[n]]
+    n = 2**31 - 1
+    while True:
+        if all(n % q for q in small):
+            yield n
+        n -= 2
+
+
+def _determinant_polynomial(minor, p):
+    """
+    Return the coefficients modulo p, starting with the constant term,
+    of the determinant of a sparse matrix of linear polynomials, as in
+    alexander_matrix, which has degree at most its size n.
+
+    Write the matrix as C + tL and choose a so that B = C + aL is
+    invertible.  Then the determinant is det(B) det(I + (t - a)K),
+    where K = B^-1 L, and the coefficients of det(I + sK) are those of
+    the characteristic polynomial of K in reverse order, up to sign.
+    That is computed from a Hessenberg matrix similar to K, so the
+    whole computation takes O(n^3) steps rather than the O(n^4) of
+    evaluating n + 1 determinants.
+    """
+    size = len(minor)
+    if have_numpy:
+        constant = numpy.zeros((size, size), dtype=numpy.int64)
+        linear = numpy.zeros((size, size), dtype=numpy.int64)
+    else:
+        constant = [[0] * size for row in minor]
+        linear = [[0] * size for row in minor]
+    for i, row in enumerate(minor):
+        for j, (a, b) in row.items():
+            constant[i][j], linear[i][j] = a % p, b % p
+    # The determinant has at most n roots, so one of the n + 1 shifts
+    # works unless it is 0 modulo p.
+    for a in range(size + 1):
+        if have_numpy:
+            B = (constant + a * linear) % p
+        else:
+            B = [[(c + a * l) % p for c, l in zip(*rows)]
+                 for rows in zip(constant, linear)]
+        det, K = _solve(B, linear, p)
+        if det:
+            break
+    else:
+        return [0] * (size + 1)
+    characteristic = _characteristic_polynomial(_hessenberg(K, p), p)
+    # Expand det(I + sK) in powers of t = s + a by Horner's rule.
+    poly = []
+    for j, c in enumerate(characteristic):
+        poly = [(lower - a * upper) % p
+                for lower, upper in zip([0] + poly, poly + [0])]
+        poly[0] = (poly[0] + (-1)**(size - j) * c) % p
+    return [det * c % p for c in poly]
+
+
+def _solve(B, L, p):
+    """
+    Reduce [B | L] modulo p by Gauss-Jordan elimination.  Returns
+    (det(B), B^-1 L), or (0, None) if B is singular.
+    """
+    size, det = len(B), 1
+    if have_numpy:
+        A = numpy.concatenate([B, L], axis=1)
+    else:
+        A = [row_b + row_l for row_b, row_l in zip(B, L)]
+    for k in range(size):
+        r = next((i for i in range(k, size) if A[i][k]), None)
+        if r is None:
+            return 0, None
+        if r != k:
+            if have_numpy:
+                A[[k, r]] = A[[r, k]]
+            else:
+                A[k], A[r] = A[r], A[k]
+            det = -det
+        pivot = int(A[k][k])
+        det = det * pivot % p
+        inverse = pow(pivot, p - 2, p)
+        if have_numpy:
+            A[k] = A[k] * inverse % p
+            factors = A[:, k].copy()
+            factors[k] = 0
+            # The products are below p^2 < 2^62.
+            A = (A - factors[:, None] * A[k]) % p
+        else:
+            row_k = A[k] = [x * inverse % p for x in A[k]]
+            for i, row_i in enumerate(A):
+                factor = row_i[k]
+                if i != k and factor:
+                    A[i] = [(x - factor * y) % p
+                            for x, y in zip(row_i, row_k)]
+    if have_numpy:
+        return det % p, A[:, size:]
+    return det % p, [row[size:] for row in A]
+
+
+def _hessenberg(K, p):
+    """
+    Return an upper Hessenberg matrix similar to K modulo p, which has
+    zeros below its subdiagonal.  Each step subtracts multiples of row
+    k + 1 from the rows below it and adds the same multiples of their
+    columns to column k + 1.  K is modified in place.
+    """
+    size = len(K)
+    for k in range(size - 2):
+        r = next((i for i in range(k + 1, size) if K[i][k]), None)
+        if r is None:
+            continue
+        _swap(K, k + 1, r)
+        inverse = pow(int(K[k + 1][k]), p - 2, p)
+        if have_numpy:
+            factors = K[k + 2:, k] * inverse % p
+            K[k + 2:] = (K[k + 2:] - factors[:, None] * K[k + 1]) % p
+            K[:, k + 1] = (K[:, k + 1] +
+                           _multiply(K[:, k + 2:], factors, p)) % p
+        else:
+            row = K[k + 1]
+            for i in range(k + 2, size):
+                factor = K[i][k] * inverse % p
+                if factor:
+                    K[i] = [(x - factor * y) % p for x, y in zip(K[i], row)]
+                    for row_j in K:
+                        row_j[k + 1] = (row_j[k + 1] + factor * row_j[i]) % p
+    return K
+
+
+def _characteristic_polynomial(H, p):
+    """
+    Return the coefficients modulo p, starting with the constant term,
+    of det(xI - H) for an upper Hessenberg matrix H.  With P_m the
+    characteristic polynomial of the leading m by m block,
+    P_(m+1) = (x - H[m][m]) P_m minus the sum over i < m of H[i][m]
+    times the subdiagonal entries H[i+1][i] ... H[m][m-1] times P_i.
+    """
+    size = len(H)
+    if have_numpy:
+        P = numpy.zeros((size + 1, size + 1), dtype=numpy.int64)
+        P[0, 0] = 1
+        H = H.tolist()
+    else:
+        P = [[1] + [0] * size]
+    for m in range(size):
+        factors, product = [0] * m, 1
+        for i in range(m - 1, -1, -1):
+            product = product * H[i + 1][i] % p
+            factors[i] = H[i][m] * product % p
+        previous = P[m]
+        if have_numpy:
+            poly = (-H[m][m] * previous) % p
+            poly[1:] += previous[:-1]
+            if m:
+                factors = numpy.array(factors, dtype=numpy.int64)
+                poly -= _multiply(P[:m].T, factors, p)
+            P[m + 1] = poly % p
+        else:
+            poly = [(lower - H[m][m] * upper) % p
+                    for lower, upper in zip([0] + previous[:-1], previous)]
+            for factor, lower in zip(factors, P):
+                if factor:
+                    poly = [(x - factor * y) % p for x, y in zip(poly, lower)]
+            P.append(poly)
+    return list(map(int, P[size]))
+
+
+def _multiply(A, x, p):
+    # The product of an int64 array A and a vector x modulo p, with
+    # entries below p < 2^31.  Splitting x into 16 bit halves keeps
+    # the sums below 2^63 for fewer than 2^16 columns.
+    high, low = x >> 16, x & 0xffff
+    return ((A @ high) % p * 0x10000 + (A @ low) % p) % p
+
+
+def crossing_order(planar_map):
+    """
+    Return the crossings of a PlanarMap, as indices, in an order in
+    which the number of edges joining a crossing in an initial segment
+    to one outside it stays small.  This is the order in which
+    kauffman_bracket adds the crossings, and the number of states it
+    keeps grows with the number of these edges.  Each crossing is
+    tried as the start of a greedy order which next adds the crossing
+    that most reduces the number of these edges; the best order found
+    is returned.
+    """
+    at, origin = planar_map.at, planar_map.origin
+    count = len(planar_map.crossings)
+    neighbors = [[origin[at[4 * v + s] ^ 1] for s in range(4)]
+                 for v in range(count)]
+    best, best_width = None, None
+    for start in range(min(count, 32)):
+        start = start * count // min(count, 32)
+        gain, done = [0] * count, [False] * count
+        order, frontier, width, cut = [], set(), 0, 0
+        v = start
+        while True:
+            done[v] = True
+            order.append(v)
+            frontier.discard(v)
+            own = sum(1 for w in neighbors[v] if w == v)
+            cut += 4 - own - 2 * gain[v]
+            width = max(width, cut)
+            for w in neighbors[v]:
+                if not done[w]:
+                    gain[w] += 1
+                    frontier.add(w)
+            if len(order) == count:
+                break
+            if frontier:
+                v = max(frontier, key=lambda w: (gain[w], -w))
+            else:
+                v = done.index(False)
+        if best_width is None or width < best_width:
+            best, best_width = order, width
+    return best or []
+
+
+def kauffman_bracket(planar_map, processes=None):
+    """
+    Return the Kauffman bracket of a diagram, given as a PlanarMap, as
+    a dict which maps each power of A to its coefficient.  The bracket
+    of a diagram with no crossings and one component is 1.  The map
+    should be built with skip_virtual=True, so that the virtual
+    crossings are not vertices and the result is the bracket of the
+    virtual link.
+
+    Rather than summing over all 2^n states, the crossings are added
+    one at a time in the order given by crossing_order.  After each
+    crossing the smoothings chosen so far join the ends of the edges
+    leaving the crossings added so far in pairs, and each of these
+    matchings is kept in a dict with the sum of A^(a - b) d^loops over
+    the choices which lead to it, where a and b count the A and B
+    smoothings, loops counts the closed loops and d = -A^2 - A^-2.
+
+    If processes is greater than 1, the smoothings of the first few
+    crossings are fixed in each possible way and the sums for these
+    choices are computed in a multiprocessing Pool.
+    """
+    at = list(planar_map.at)
+    signs = [1 if crossing.sign() == 'RH' else -1
+             for crossing in planar_map.crossings]
+    order = crossing_order(planar_map)
+    if processes and processes > 1 and len(order) > 8:
+        fixed = min(len(order), processes.bit_length() + 1)
+        tasks = [(at, signs, order, choices)
+                 for choices in product((1, -1), repeat=fixed)]
+        with multiprocessing.Pool(processes) as pool:
+            parts = pool.map(_bracket_sum, tasks)
+    else:
+        parts = [_bracket_sum((at, signs, order, ()))]
+    total = {}
+    for part in parts:
+        total = _poly_add(total, part)
+    for n in range(planar_map.free_loops):
+        total = _poly_multiply(total, _loop)
+    return _divide_by_loop(total)
+
+
+def jones_polynomial(bracket, writhe):
+    """
+    Return the Jones polynomial of a link from the Kauffman bracket of
+    a diagram and its writhe, as a dict which maps each power of t to
+    its coefficient.  The powers are integers for a knot, and may be
+    halves of odd integers (as floats) for a link or a virtual knot.
+    The right handed trefoil gives {1: 1, 3: 1, 4: -1}.
+    """
+    # Multiply by (-A^3)^-writhe and substitute A = t^(-1/4).
+    sign = -1 if writhe % 2 else 1
+    result = {}
+    for power, coefficient in bracket.items():
+        exponent = -(power - 3 * writhe) / 4
+        if exponent == int(exponent):
+            exponent = int(exponent)
+        result[exponent] = sign * coefficient
+    return result
+
+
+# The value d = -A^2 - A^-2 of a closed loop.
+_loop = {2: -1, -2: -1}
+
+
+def _poly_add(p, q):
+    result = dict(p)
+    for power, coefficient in q.items():
+        total = result.get(power, 0) + coefficient
+        if total:
+            result[power] = total
+        else:
+            result.pop(power, None)
+    return result
+
+
+def _poly_multiply(p, q):
+    result = {}
+    for a, x in p.items():
+        for b, y in q.items():
+            result[a + b] = result.get(a + b, 0) + x * y
+    return {power: c for power, c in result.items() if c}
+
+
+def _divide_by_loop(p):
+    # Exact division by d = -A^2 - A^-2, from the highest power down.
+    p, quotient = dict(p), {}
+    while p:
+        top = max(p)
+        c = p.pop(top)
+        quotient[top - 2] = -c
+        rest = p.get(top - 4, 0) - c
+        if rest:
+            p[top - 4] = rest
+        else:
+            p.pop(top - 4, None)
+    return quotient
+
+
+def _bracket_sum(task):
+    """
+    The state sum over the smoothings of all of the crossings, in the
+    order given, except that the first crossings are smoothed as in
+    choices, with 1 for an A smoothing and -1 for a B smoothing.  Each
+    loop, including the last one, contributes a factor of d.
+    """
+    at, signs, order, choices = task
+    boundary = {}  # The position in the matchings of each loose end.
+    states = {(): {0: 1}}
+    # Smoothing a crossing closes at most two loops.
+    powers = [{0: 1}, _loop, _poly_multiply(_loop, _loop)]
+    for n, v in enumerate(order):
+        ends = at[4 * v: 4 * v + 4]
+        # Sort the positions at the crossing into those whose edges
+        # join a loose end, join another position at this crossing or
+        # become loose ends.
+        glued, inner, fresh = {}, {}, []
+        for s, h in enumerate(ends):
+            if h ^ 1 in boundary:
+                glued[s] = boundary[h ^ 1]
+            elif h ^ 1 in ends:
+                inner[s] = ends.index(h ^ 1)
+            else:
+                fresh.append(s)
+        joined = {i: s for s, i in glued.items()}
+        keep = sorted(i for i in range(len(boundary)) if i not in joined)
+        renumber = {i: k for k, i in enumerate(keep)}
+        loose = {s: len(keep) + k for k, s in enumerate(fresh)}
+        survivors = sorted(boundary, key=boundary.get)
+        boundary = {h: renumber[boundary[h]] for h in survivors
+                    if boundary[h] in renumber}
+        for s in fresh:
+            boundary[ends[s]] = loose[s]
+        # The A smoothing joins the corners which the overstrand
+        # sweeps when turned counterclockwise.
+        if signs[v] > 0:
+            smoothings = (((1, 2), (0, 3)), 1), (((0, 1), (2, 3)), -1)
+        else:
+            smoothings = (((0, 1), (2, 3)), 1), (((1, 2), (0, 3)), -1)
+        if n < len(choices):
+            smoothings = smoothings[:1] if choices[n] > 0 else smoothings[1:]
+        new_states = {}
+        for pairs, power in smoothings:
+            partner = {}
+            for a, b in pairs:
+                partner[a], partner[b] = b, a
+            for state, poly in states.items():
+                matching, loops = _smooth(state, keep, renumber, glued, inner,
+                                          loose, joined, partner)
+                term = {p + power: c for p, c in poly.items()}
+                if loops:
+                    term = _poly_multiply(term, powers[loops])
+                old = new_states.get(matching)
+                new_states[matching] = term if old is None else _poly_add(old, term)
+        states = new_states
+    return states.get((), {})
+
+
+def _smooth(state, keep, renumber, glued, inner, loose, joined, partner):
+    """
+    Return the matching of the loose ends after a crossing is
+    smoothed, and the number of loops which were closed.  The path
+    from a loose end alternates between the edges which were matched
+    before, the edges at the crossing and the arcs of the smoothing.
+    """
+    visited = set()
+
+    def follow(s):
+        # Leave position s along the smoothing, and return the loose
+        # end where the path stops.
+        while True:
+            visited.add(s)
+            u = partner[s]
+            visited.add(u)
+            if u in loose:
+                return loose[u]
+            if u in inner:
+                s = inner[u]
+                continue
+            j = state[glued[u]]
+            if j in renumber:
+                return renumber[j]
+            s = joined[j]
+
+    matching = [0] * (len(keep) + len(loose))
+    for k, i in enumerate(keep):
+        j = state[i]
+        matching[k] = renumber[j] if j in renumber else follow(joined[j])
+    for s, k in loose.items():
+        matching[k] = follow(s)
+    loops = 0
+    for s in range(4):
+        if s not in visited:
+            loops += 1
+            while s not in visited:
+                visited.add(s)
+                u = partner[s]
+                visited.add(u)
+                s = inner[u] if u in inner else joined[state[glued[u]]]
+    return tuple(matching), loops
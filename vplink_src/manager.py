@@ -20,17 +20,46 @@ diagrams as well as computing features of the diagram, such as the components
 of the link.
 """
 
+import io
 import time
+import hashlib
+from array import array
 from string import ascii_lowercase
 from gui import tkMessageBox
 from vertex import Vertex
 from arrow import Arrow, default_arrow_params
-from crossings import Crossing, ECrossing
+from crossings import Crossing, ECrossing, CrossingRegistry
 from smooth import TikZPicture
+from spatial import SegmentGrid, PointGrid
+from intersections import pair_parameters, sweep_crossings
+from canonical import canonical_code
+from planar import PlanarMap
+from invariants import (goeritz_matrices, signature_and_determinant,
+                        wirtinger_relations, alexander_polynomial,
+                        kauffman_bracket, jones_polynomial)
+
+try:
+    import numpy
+    have_numpy = True
+except ImportError:
+    have_numpy = False
 
 DT_alphabet = '_abcdefghijklmnopqrstuvwxyzZYXWVUTSRQPONMLKJIHGFEDCBA'
 
 
+def curve_names():
+    """
+    Generate the names a, ..., z, a0, ..., z0, a1, ..., z1, ... used
+    for the curves in a Twister surface file.
+    """
+    yield from ascii_lowercase
+    index = 0
+    while True:
+        for letter in ascii_lowercase:
+            yield '%s%d' % (letter, index)
+        index += 1
+
+
 class LinkManager:
     """
     Manages the data associated with a link projection.
@@ -42,11 +71,19 @@ class LinkManager:
     def initialize(self, canvas=None):
         self.Arrows = []
         self.Vertices = []
-        self.Crossings = []
-        self.CrossPoints = []
+        self.Crossings = CrossingRegistry()
+        self.CrossPoints = {}
+        self.ArrowGrid = SegmentGrid()
+        self.VertexGrid = PointGrid()
+        self.CrossingGrid = PointGrid()
         self.LiveArrow1 = None
         self.LiveArrow2 = None
         self.ActiveVertex = None
+        self.topology = 0
+        self.component_cache = None
+        self.code_cache = None
+        self.generation_count = 0
+        self.memo = {}
         self.DTlabels = []
         self.labels = []
         self.shift_stamp = time.time()
@@ -103,11 +140,329 @@ class LinkManager:
         for arrow in self.Arrows:
             arrow.vectorize()
             arrow.params = self.arrow_params
+        # Only the crossings whose arrows have moved need to be located.
+        stale = [c for c in self.Crossings if not c.is_located()]
+        locations = pair_parameters([(c.over, c.under) for c in stale])
+        for c, t in zip(stale, locations):
+            c.place(t)
         for c in self.Crossings:
-            c.locate()
-        self.Crossings = [c for c in self.Crossings if c.x is not None]
-        self.CrossPoints = [Vertex(c.x, c.y, self.canvas, style='hidden')
-                            for c in self.Crossings]
+            if c.x is None:
+                self.Crossings.discard(c)
+        if stale:
+            self.changed()
+        self.CrossPoints = {c: Vertex(c.x, c.y, self.canvas, style='hidden')
+                            for c in self.Crossings}
+        self.CrossingGrid.rebuild((c, c.x, c.y) for c in self.Crossings)
+        self.reindex_vertices()
+        self.reindex_arrows()
+
+    def crossing_pairs(self):
+        """
+        Return a list of all pairs of arrows in the diagram which
+        cross, whether or not they have a Crossing.  The pairs are
+        found from the geometry alone, by a sweep.
+        """
+        for arrow in self.Arrows:
+            arrow.vectorize()
+        arrows = self.Arrows
+        return [(arrows[i], arrows[j])
+                for i, j, t, s in sweep_crossings(arrows)]
+
+    def validate_crossings(self):
+        """
+        Compare the list of crossings with the geometry of the diagram.
+        Returns a pair (missing, spurious), where missing is a list of
+        the pairs of crossing arrows which have no Crossing, and
+        spurious is a list of the Crossings whose arrows do not cross.
+        """
+        missing, found = [], set()
+        for A, B in self.crossing_pairs():
+            crossing = self.Crossings.get(A, B)
+            if crossing is None:
+                missing.append((A, B))
+            else:
+                found.add(id(crossing))
+        spurious = [c for c in self.Crossings if id(c) not in found]
+        return missing, spurious
+
+    def repair_crossings(self):
+        """
+        Make the list of crossings agree with the geometry of the
+        diagram.  Existing crossings keep their over/under and virtual
+        flags and their labels.  A missing crossing is added with the
+        later arrow passing over, as if it had just been drawn.
+        Returns the number of crossings added and removed.
+        """
+        missing, spurious = self.validate_crossings()
+        for crossing in spurious:
+            self.Crossings.discard(crossing)
+        for A, B in missing:
+            if self.arrow_id(A) < self.arrow_id(B):
+                A, B = B, A
+            self.Crossings.append(Crossing(A, B))
+        if missing or spurious:
+            self.changed()
+        self.update_crosspoints()
+        return len(missing), len(spurious)
+
+    def add_vertex(self, vertex):
+        """
+        Add a vertex to the diagram and to the vertex grid.
+        """
+        vertex.id = len(self.Vertices)
+        self.Vertices.append(vertex)
+        self.changed(topology=True)
+        self.index_vertex(vertex)
+
+    def remove_vertex(self, vertex):
+        """
+        Remove this vertex (not one which is merely close to it) from
+        the diagram and from the vertex grid.
+        """
+        self.Vertices = [v for v in self.Vertices if v is not vertex]
+        self.changed(topology=True)
+        self.VertexGrid.remove(vertex)
+        self.renumber(self.Vertices)
+
+    def index_vertex(self, vertex):
+        """
+        Record the current position of a vertex in the vertex grid.
+        This must be called whenever the vertex moves.
+        """
+        self.VertexGrid.insert(vertex, vertex.x, vertex.y)
+        self.changed()
+
+    def reindex_vertices(self):
+        self.VertexGrid.rebuild((v, v.x, v.y) for v in self.Vertices)
+
+    def translate_grids(self, dx, dy):
+        """
+        Update the spatial indexes after every vertex has been shifted
+        by (dx, dy).
+        """
+        for grid in self.ArrowGrid, self.VertexGrid, self.CrossingGrid:
+            grid.translate(dx, dy)
+
+    def translate(self, dx, dy):
+        """
+        Shift every vertex of the diagram by (dx, dy), and move the
+        crossings, their crossing points and the spatial indexes with
+        them.  Each crossing is located again, since rounding can
+        change whether two nearly touching arrows cross, and a crossing
+        which can no longer be located is removed.  Returns the list of
+        the removed crossings, whose understrands need to be redrawn.
+        """
+        for vertex in self.Vertices:
+            vertex.x += dx
+            vertex.y += dy
+        for arrow in self.Arrows:
+            arrow.vectorize()
+        self.translate_grids(dx, dy)
+        self.changed()
+        crossings = list(self.Crossings)
+        locations = pair_parameters([(c.over, c.under) for c in crossings])
+        lost = []
+        for crossing, t in zip(crossings, locations):
+            crossing.place(t)
+            if crossing.x is None:
+                lost.append(crossing)
+                self.remove_crossing(crossing)
+            else:
+                self.index_crossing(crossing)
+        return lost
+
+    def find_vertex(self, x, y, condition=None):
+        """
+        Return the vertex nearest to (x, y) among those which are
+        equivalent to a vertex at that point and which satisfy the
+        condition, or None.
+        """
+        return self.VertexGrid.nearest(x, y, Vertex.epsilon, condition)
+
+    def find_crossing(self, x, y):
+        """
+        Return the crossing whose crossing point is nearest to (x, y),
+        if it is within Vertex.epsilon of that point, or None.
+        """
+        return self.CrossingGrid.nearest(x, y, Vertex.epsilon)
+
+    def add_crossing(self, crossing):
+        """
+        Add a located crossing to the diagram.
+        """
+        self.Crossings.append(crossing)
+        self.changed()
+        self.index_crossing(crossing)
+
+    def remove_crossing(self, crossing):
+        """
+        Remove a crossing from the diagram.
+        """
+        self.Crossings.remove(crossing)
+        self.changed()
+        self.CrossPoints.pop(crossing, None)
+        self.CrossingGrid.remove(crossing)
+
+    def index_crossing(self, crossing):
+        """
+        Record the current location of a crossing, by moving its
+        crossing point and its entry in the crossing grid.  This must
+        be called whenever the crossing is located again.
+        """
+        point = self.CrossPoints.get(crossing)
+        if point is None:
+            self.CrossPoints[crossing] = Vertex(crossing.x, crossing.y,
+                                                self.canvas, style='hidden')
+        else:
+            point.x, point.y = crossing.x, crossing.y
+        self.CrossingGrid.insert(crossing, crossing.x, crossing.y)
+
+    def arrows_near(self, x, y, tolerance):
+        """
+        Return a list containing the arrows which might pass within
+        tolerance of the point (x, y).
+        """
+        # Arrow.too_close accepts points in a rectangle around the
+        # arrow, whose corners stick out of the bounding box of the
+        # arrow by up to sqrt(2) * tolerance.
+        return self.ArrowGrid.query(x, y, x, y, 1.5 * tolerance)
+
+    def arrow_near_point(self, point, tolerance=None):
+        """
+        Return an arrow which is too close to the point, in the sense
+        of Arrow.too_close, or None if there is no such arrow.
+        """
+        e = tolerance if tolerance else Arrow.epsilon
+        for arrow in self.arrows_near(point.x, point.y, e):
+            if arrow.too_close(point, tolerance):
+                return arrow
+        return None
+
+    def vertex_near_arrow(self, arrow, tolerance=None):
+        """
+        Return a vertex which is too close to the arrow, in the sense
+        of Arrow.too_close, or None if there is no such vertex.
+        """
+        e = tolerance if tolerance else Arrow.epsilon
+        start, end = arrow.start, arrow.end
+        for vertex in self.VertexGrid.query(start.x, start.y, end.x, end.y,
+                                            1.5 * e):
+            if arrow.too_close(vertex, tolerance):
+                return vertex
+        return None
+
+    def crossing_near_arrow(self, arrow, tolerance=None):
+        """
+        Return the crossing point of a crossing not involving the arrow
+        which is too close to the arrow, in the sense of
+        Arrow.too_close, or None if there is no such crossing.
+        """
+        e = tolerance if tolerance else Arrow.epsilon
+        start, end = arrow.start, arrow.end
+        for crossing in self.CrossingGrid.query(start.x, start.y, end.x, end.y,
+                                                1.5 * e):
+            point = self.CrossPoints[crossing]
+            if arrow not in crossing and arrow.too_close(point, tolerance):
+                return point
+        return None
+
+    def add_arrow(self, arrow):
+        """
+        Add an arrow to the diagram and to the arrow grid.
+        """
+        arrow.id = len(self.Arrows)
+        self.Arrows.append(arrow)
+        self.changed(topology=True)
+        self.index_arrow(arrow)
+
+    def remove_arrow(self, arrow):
+        """
+        Remove an arrow, and its crossings, from the diagram and from
+        the grids.
+        """
+        del self.Arrows[self.arrow_id(arrow)]
+        self.changed(topology=True)
+        self.renumber(self.Arrows)
+        self.ArrowGrid.remove(arrow)
+        for crossing in self.Crossings.remove_arrow(arrow):
+            self.CrossPoints.pop(crossing, None)
+            self.CrossingGrid.remove(crossing)
+
+    def reverse_path(self, vertex, crossings=[]):
+        """
+        Reverse the orientation of the component containing the vertex,
+        redrawing its arrows with the given crossings.
+        """
+        vertex.reverse_path(crossings)
+        self.changed(topology=True)
+
+    @staticmethod
+    def renumber(objects):
+        """
+        Set the id of each vertex, arrow or crossing in the list to its
+        position in the list.
+        """
+        for n, obj in enumerate(objects):
+            obj.id = n
+
+    def _id(self, objects, obj):
+        n = obj.id
+        if n is None or n >= len(objects) or objects[n] is not obj:
+            # The list has been changed behind our back.
+            self.renumber(objects)
+            n = obj.id
+            if n is None or n >= len(objects) or objects[n] is not obj:
+                raise ValueError('%s is not in the diagram.' % obj)
+        return n
+
+    def vertex_id(self, vertex):
+        """
+        Return the position of this vertex (not one which is merely
+        close to it) in the list of vertices.
+        """
+        return self._id(self.Vertices, vertex)
+
+    def arrow_id(self, arrow):
+        """
+        Return the position of the arrow in the list of arrows.
+        """
+        return self._id(self.Arrows, arrow)
+
+    def crossing_id(self, crossing):
+        """
+        Return the position of the crossing with the same arrows in the
+        list of crossings.
+        """
+        return self.Crossings.number(crossing)
+
+    def index_arrow(self, arrow):
+        """
+        Record the current position of an arrow in the arrow grid.
+        This must be called whenever an endpoint of the arrow moves.
+        """
+        if arrow.start is None or arrow.end is None:
+            self.ArrowGrid.remove(arrow)
+        else:
+            self.ArrowGrid.insert(arrow, arrow.start.x, arrow.start.y,
+                                  arrow.end.x, arrow.end.y)
+
+    def reindex_arrows(self):
+        """
+        Rebuild the arrow grid, e.g. after every vertex has moved.
+        """
+        self.ArrowGrid.rebuild(
+            (a, a.start.x, a.start.y, a.end.x, a.end.y) for a in self.Arrows
+            if a.start is not None and a.end is not None)
+
+    def crossing_candidates(self, arrow):
+        """
+        Return the arrows, other than this one, which share a grid
+        cell with the bounding box of the arrow at its current
+        position.  Every arrow which crosses it is among them.
+        """
+        start, end = arrow.start, arrow.end
+        return [a for a in self.ArrowGrid.query(start.x, start.y, end.x, end.y)
+                if a is not arrow]
 
     def arrow_components(self, include_isolated_vertices=False, distinguish_closed=False):
         """
@@ -117,39 +472,72 @@ class LinkManager:
         is set to True then two lists are returned, the first has the closed
         components the second has the non-closed components.
         """
-        pool = [v.out_arrow for v in self.Vertices if v.in_arrow is None]
-        pool += [v.out_arrow for v in self.Vertices if v.in_arrow is not None]
-        closed, nonclosed = [], []
-        while pool:
-            first_arrow = pool.pop(0)
-            if first_arrow is None:
-                continue
-            component = [first_arrow]
-            while component[-1].end is not component[0].start:
-                next_arrow = component[-1].end.out_arrow
-                if next_arrow is None:
-                    break
-                pool.remove(next_arrow)
-                component.append(next_arrow)
-            if next_arrow is None:
-                nonclosed.append(component)
-            else:
-                closed.append(component)
+        closed, nonclosed, isolated = self._components()
+        closed = sorted(closed, key=lambda x: (x[1][0].component, x[0]))
+        nonclosed = list(nonclosed)
         if include_isolated_vertices:
-            for vertex in [v for v in self.Vertices if v.is_isolated()]:
-                nonclosed.append([Arrow(vertex, vertex, self.canvas,
-                                        color=vertex.color)])
-
-        def oldest_vertex(component):
-            def oldest(arrow):
-                return min([self.Vertices.index(v)
-                            for v in [arrow.start, arrow.end] if v])
+            nonclosed += [(age, [Arrow(vertex, vertex, self.canvas,
+                                       color=vertex.color)])
+                          for age, vertex in isolated]
+            nonclosed.sort(key=lambda x: x[0])
+        closed = [list(component) for age, component in closed]
+        nonclosed = [list(component) for age, component in nonclosed]
+        return (closed, nonclosed) if distinguish_closed else closed + nonclosed
 
-            return min([len(self.Vertices)] + [oldest(a) for a in component])
+    def component_ids(self):
+        """
+        Return a dict mapping each arrow to the index of its component
+        in the list returned by arrow_components().
+        """
+        return {arrow: n for n, component in enumerate(self.arrow_components())
+                for arrow in component}
 
-        closed.sort(key=lambda x: (x[0].component, oldest_vertex(x)))
-        nonclosed.sort(key=oldest_vertex)
-        return (closed, nonclosed) if distinguish_closed else closed + nonclosed
+    def _components(self):
+        """
+        Find the components of the diagram by following the arrows
+        from vertex to vertex.  Returns lists of pairs (age, component)
+        for the closed and the nonclosed components, with the
+        nonclosed ones sorted by age, and a list of pairs (age, vertex)
+        for the isolated vertices.  The age of a component is the
+        position in the list of vertices of its oldest vertex.  The
+        result is cached until a vertex is added or removed or an arrow
+        is attached to or detached from a vertex.
+        """
+        if self.component_cache and self.component_cache[0] == self.topology:
+            return self.component_cache[1]
+        self.renumber(self.Vertices)
+        # Start at the beginning of each path, then at the oldest
+        # remaining vertex of each closed loop.
+        starts = [v for v in self.Vertices if v.in_arrow is None]
+        starts += [v for v in self.Vertices if v.in_arrow is not None]
+        closed, nonclosed, isolated, seen = [], [], [], set()
+        for vertex in starts:
+            arrow = vertex.out_arrow
+            if arrow is None:
+                if vertex.in_arrow is None:
+                    isolated.append((vertex.id, vertex))
+                continue
+            if arrow in seen:
+                continue
+            component, oldest = [], vertex.id
+            while True:
+                component.append(arrow)
+                seen.add(arrow)
+                end = arrow.end
+                oldest = min(oldest, end.id)
+                if end is vertex:
+                    closed.append((oldest, component))
+                    break
+                arrow = end.out_arrow
+                if arrow is None:
+                    nonclosed.append((oldest, component))
+                    break
+                if arrow in seen:
+                    raise ValueError('The arrows do not form a link diagram.')
+        nonclosed.sort(key=lambda x: x[0])
+        result = (closed, nonclosed, isolated)
+        self.component_cache = (self.topology, result)
+        return result
 
     def polylines(self, break_at_overcrossings=True):
         """
@@ -215,11 +603,9 @@ class LinkManager:
         for component in arrow_components:
             crosses = []
             for arrow in component:
-                arrow_crosses = [(c.height(arrow), c, arrow)
-                                 for c in self.Crossings if arrow in c]
-                arrow_crosses.sort()
-                crosses += arrow_crosses
-            result.append([ECrossing(c[1], c[2]) for c in crosses])
+                crosses += [ECrossing(c, arrow)
+                            for t, c in arrow.crossings_along(self.Crossings)]
+            result.append(crosses)
         return result
 
     def sorted_components(self):
@@ -293,6 +679,61 @@ class LinkManager:
 
         return sorted_components
 
+    def alternating_flips(self):
+        """
+        Return a list of the crossings which need to be reversed to
+        make the projection alternating.  Virtual crossings are
+        ignored, so the classical crossings alternate along each
+        component.  Requires that all components be closed, and raises
+        ValueError otherwise.
+
+        Along each component the classical crossings are alternately
+        over and under, starting with one or the other.  The choices
+        for the components which share crossings are tied together;
+        the first component of each connected group starts over.  In
+        a virtual diagram it may be impossible to satisfy every
+        crossing, and those which cannot be made to alternate are left
+        as they are.
+        """
+        components = self.crossing_components()
+        # For each classical crossing, the two passages through it,
+        # as triples (component, parity, goes over).
+        passages = {}
+        for n, component in enumerate(components):
+            parity = 0
+            for ec in component:
+                if ec.crossing.is_virtual:
+                    continue
+                passages.setdefault(ec.crossing, []).append(
+                    (n, parity, ec.goes_over()))
+                parity ^= 1
+        # A passage goes over when its parity agrees with the phase of
+        # its component, and at each crossing one passage must go over.
+        neighbors = [[] for component in components]
+        for (m, a, over), (n, b, under) in passages.values():
+            neighbors[m].append((n, 1 ^ a ^ b))
+            neighbors[n].append((m, 1 ^ a ^ b))
+        phase = [None] * len(components)
+        for start in range(len(components)):
+            if phase[start] is not None:
+                continue
+            phase[start], queue = 0, [start]
+            while queue:
+                m = queue.pop()
+                for n, bit in neighbors[m]:
+                    if phase[n] is None:
+                        phase[n] = phase[m] ^ bit
+                        queue.append(n)
+        flips = []
+        for crossing in self.Crossings:
+            if crossing not in passages:
+                continue
+            (m, a, over), (n, b, under) = passages[crossing]
+            first_over, second_over = a == phase[m], b == phase[n]
+            if first_over != second_over and first_over != over:
+                flips.append(crossing)
+        return flips
+
     def SnapPea_KLPProjection(self):
         """
         Constructs a python simulation of a SnapPea KLPProjection
@@ -322,6 +763,53 @@ class LinkManager:
 
         \
         """
+        arrays = self.SnapPea_KLP_arrays()
+        if arrays is None:
+            return None
+        num_crossings, num_free_loops, num_components, KLP = arrays
+        neighbor, strand, component = KLP['neighbor'], KLP['strand'], KLP['component']
+        signs = {1: 'RH', -1: 'LH', 0: None}
+        for n, crossing in enumerate(self.Crossings):
+            for k, XY in enumerate('XY'):
+                if component[2 * n + k] < 0:
+                    continue
+                crossing.KLP['sign'] = signs[KLP['sign'][n]]
+                crossing.KLP[XY + 'backward_neighbor'] = neighbor[4 * n + 2 * k]
+                crossing.KLP[XY + 'backward_strand'] = 'XY'[strand[4 * n + 2 * k]]
+                crossing.KLP[XY + 'forward_neighbor'] = neighbor[4 * n + 2 * k + 1]
+                crossing.KLP[XY + 'forward_strand'] = 'XY'[strand[4 * n + 2 * k + 1]]
+                crossing.KLP[XY + 'component'] = component[2 * n + k]
+        KLP_crossings = [crossing.KLP for crossing in self.Crossings]
+        return num_crossings, num_free_loops, num_components, KLP_crossings
+
+    def SnapPea_KLP_arrays(self):
+        """
+        Constructs the data of a SnapPea KLPProjection, as described
+        in SnapPea_KLPProjection, in contiguous arrays of C ints
+        rather than one dictionary per crossing.  Requires that all
+        components be closed, and returns None otherwise.  Returns
+        (num_crossings, num_free_loops, num_components, KLP) where KLP
+        is a dict of arrays.  The crossings are numbered by their
+        position in the list of crossings, and for the crossing n:
+
+           * KLP['neighbor'][4*n + 2*k + d] is the neighbor of the
+           crossing along the strand k, backward if d = 0 and forward
+           if d = 1, where k = 0 for the X strand and 1 for the Y
+           strand;
+
+           * KLP['strand'][4*n + 2*k + d] is the strand of that
+           neighbor through which it is reached, 0 for X and 1 for Y;
+
+           * KLP['component'][2*n + k] is the component of strand k;
+
+           * KLP['sign'][n] is 1 for a right handed crossing, -1 for a
+           left handed one and 0 if the sign is undefined.
+
+        The entries for a strand which is not traversed are -1.  The
+        arrays support the buffer protocol, so they can be passed to C
+        code, or viewed with numpy.frombuffer(array, dtype=numpy.intc),
+        without copying.
+        """
         try:
             components = self.crossing_components()
         except ValueError:
@@ -329,85 +817,40 @@ class LinkManager:
         num_crossings = len(self.Crossings)
         num_free_loops = 0
         num_components = len(components)
-        id = lambda x: self.Crossings.index(x.crossing)
-        for component in components:
-            this_component = components.index(component)
+        neighbor = array('i', [-1]) * (4 * num_crossings)
+        strand = array('i', [-1]) * (4 * num_crossings)
+        component_of = array('i', [-1]) * (2 * num_crossings)
+        sign = array('i', [0]) * num_crossings
+        number = {'X': 0, 'Y': 1}
+        signs = {'RH': 1, 'LH': -1}
+        for this_component, component in enumerate(components):
             N = len(component)
+            ids = [self.crossing_id(ec.crossing) for ec in component]
+            strands = [number.get(ec.strand, 1) for ec in component]
             for n in range(N):
-                this = component[n]
-                previous = component[n - 1]
-                next = component[(n + 1) % N]
-                this.crossing.KLP['sign'] = sign = this.crossing.sign()
-                if this.strand == 'X':
-                    this.crossing.KLP['Xbackward_neighbor'] = id(previous)
-                    this.crossing.KLP['Xbackward_strand'] = previous.strand
-                    this.crossing.KLP['Xforward_neighbor'] = id(next)
-                    this.crossing.KLP['Xforward_strand'] = next.strand
-                    this.crossing.KLP['Xcomponent'] = this_component
-                else:
-                    this.crossing.KLP['Ybackward_neighbor'] = id(previous)
-                    this.crossing.KLP['Ybackward_strand'] = previous.strand
-                    this.crossing.KLP['Yforward_neighbor'] = id(next)
-                    this.crossing.KLP['Yforward_strand'] = next.strand
-                    this.crossing.KLP['Ycomponent'] = this_component
+                this = ids[n]
+                k = strands[n]
+                sign[this] = signs.get(component[n].crossing.sign(), 0)
+                i = 4 * this + 2 * k
+                neighbor[i], strand[i] = ids[n - 1], strands[n - 1]
+                m = (n + 1) % N
+                neighbor[i + 1], strand[i + 1] = ids[m], strands[m]
+                component_of[2 * this + k] = this_component
             if N == 0:
                 num_free_loops += 1
-        KLP_crossings = [crossing.KLP for crossing in self.Crossings]
-        return num_crossings, num_free_loops, num_components, KLP_crossings
+        KLP = {'neighbor': neighbor, 'strand': strand,
+               'component': component_of, 'sign': sign}
+        return num_crossings, num_free_loops, num_components, KLP
 
     def PD_code(self):
         """
         Return the PD (Planar Diagram) code for the link projection,
-        as a list of 4-tuples.
-        """
-        # We view an ecrossing as corresponding to the outgoing arc
-        # of the diagram at the ecrossing.crossing.
-        dt = self.new_DT(sign=True)
-        if dt:
-            link = dt.pop()
-            new_pd = []
-            max_val = 2 * len(dt)
-            for crossing in dt:
-                a = crossing[0]
-                b = crossing[1]
-                c = a + 1
-                d = b + 1
-                if b == max_val:
-                    d = 1
-                elif a == max_val:
-                    c = 1
-                # if crossing.sign() == right-handed or left-handed crossing
-                if crossing[2] == 'RH':
-                    new_pd.append((a, b, c, d))
-                else:
-                    new_pd.append((a, d, c, b))
-            new_pd.append(link)
-            return new_pd
-        else:
-            return None
-        try:
-            components = self.crossing_components()
-        except ValueError:
+        as a list of 4-tuples, followed by the link flag.
+        """
+        codes = self.crossing_codes()
+        if codes is None:
             return None
-        ecrossings = [ec for component in components
-                      for ec in component]
-        counter = dict((ec, k + 1) for k, ec in enumerate(ecrossings))
-        over_dict, under_dict = {}, {}
-        for component in components:
-            for n, ec in enumerate(component):
-                incoming = counter[component[n - 1]]
-                outgoing = counter[component[n]]
-                D = over_dict if ec.goes_over() else under_dict
-                D[ec.crossing] = (incoming, outgoing)
-        PD = []
-        crossings = [i for i in self.Crossings if not i.is_virtual]
-        for crossing in crossings:
-            under, over = under_dict[crossing], over_dict[crossing]
-            if crossing.sign() == 'RH':
-                PD.append((under[0], over[1], under[1], over[0]))
-            else:
-                PD.append((under[0], over[0], under[1], over[1]))
-        return PD
+        return codes['PD'] + [codes['link']]
 
     def test_fcn(self):
         # test DT revised for links
@@ -449,77 +892,194 @@ class LinkManager:
 
         print(f"Test DT:\n{test_dt}\n")
 
-    def new_DT(self, sign=False):
-        ecrossing_components = self.crossing_components()
-        if ecrossing_components:
-            # test_dt = [[] for i in range(len(ecrossing_components))]
-            new_dt = []
-            # curr is used instead of enums because
-            # it can count the total crossings of
-            # all ecrossing components (which are numbered
-            # in order... we keep track of the labels by the value curr)
-            curr = 0
-            visited_crossings = []
-            link = False
-            # go through every crossing, find which labels are under/over,
-            # then append as a tuple to our dt convention.
-            # crossings are denoted (under, over)
-            # print('total crossings:', len(self.Crossings))
-            for i, crossing in enumerate(self.Crossings):
-                visited_crossings.append(crossing)
-                num_virtual = 0
-                # link_num = None
-                over = None
-                under = None
-                for num_links, ecrossings in enumerate(ecrossing_components):
-                    if num_links > 0: link = True
-                    for ecrossing in ecrossings:
-                        curr += 1
-                        # check if the current crossing is virtual and count it if true
-                        # it will count this value more than once, but it is reset at each outer loop
-                        if ecrossing.crossing.is_virtual:
-                            num_virtual += 1
-                        # otherwise, check if over and under are found
-                        # if they arent, check if this crossing is the most
-                        # recently visited crossing
-                        else:
-                            if over is not None and under is not None:
-                                break
-                            if ecrossing.crossing == visited_crossings[-1]:
-                                if ecrossing.goes_over():
-                                    over = curr - num_virtual
-                                else:
-                                    under = curr - num_virtual
-                # once over and under are found
-                # (which is guaranteed, we iterate through every single crossing)
-                # append it to our new dt convention
-                if sign:
-                    new_dt.append((over, under, crossing.sign()))
-                else:
-                    new_dt.append((over, under))
-                crossing.hit1 = new_dt[i][0]
-                crossing.hit2 = new_dt[i][1]
-                # reset current so that we don't double-count crossings
-                curr = 0
-        else:
-            return None
-        # self.test_fcn()
+    def changed(self, topology=False):
+        """
+        Record that the diagram has been edited, so that cached data
+        will be computed again.  The methods which edit the diagram
+        call this themselves.  Code which attaches arrows to vertices,
+        or detaches them, directly should call it with topology=True,
+        so that the components are found again too.
+        """
+        self.generation_count += 1
+        if topology:
+            self.topology += 1
 
-        if sign:
-            new_dt = [i for i in new_dt if i[0] is not None and i[1] is not None]
-            new_dt.sort(key=lambda x: min(x[0], x[1]))
-        else:
-            new_dt = [i for i in new_dt if i != (None, None)]
-            new_dt.sort(key=min)
+    def cached(self, key, compute):
+        """
+        Return the value of compute(), which is remembered under the
+        given key until the diagram changes.  The value is shared by
+        all callers, who should not modify it.
+        """
+        if self.memo.get('generation') != self.generation_count:
+            self.memo = {'generation': self.generation_count}
+        try:
+            return self.memo[key]
+        except KeyError:
+            value = self.memo[key] = compute()
+            return value
+
+    def crossing_marks(self):
+        """
+        Return the labels and marks which the DT computations leave on
+        the crossings, so that they can be put back later.
+        """
+        return [(c, c.hit1, c.hit2, c.flipped, c.comp1, c.comp2)
+                for c in self.Crossings]
 
-        # print(new_dt, sep='\n\n')
+    @staticmethod
+    def restore_marks(marks):
+        for c, hit1, hit2, flipped, comp1, comp2 in marks:
+            c.hit1, c.hit2, c.flipped = hit1, hit2, flipped
+            c.comp1, c.comp2 = comp1, comp2
+
+    def crossing_codes(self):
+        """
+        Compute the codes which are built from the labels of the
+        non-virtual ecrossings, numbered consecutively through the
+        components in order.  This is done with one traversal of the
+        crossing components.  Returns None if there are no components,
+        otherwise a dict with the following entries:
 
-        # self.test_fcn()
-        new_dt.append(link)
-        if link:
-            return new_dt
+           * 'DT': the (over, under) label pairs of the crossings,
+           sorted by their smaller label;
 
-        return new_dt
+           * 'signed_DT': the same, as (over, under, sign) triples;
+
+           * 'Gauss': the crossings met in label order, numbered in
+           order of first appearance, positive when passing over and
+           negative when passing under;
+
+           * 'PD': the PD 4-tuples, in the order of the DT code;
+
+           * 'link': True if the diagram has crossings and more than
+           one component.
+
+        As a side effect, the hit1 and hit2 attributes of each crossing
+        are set to its over and under labels (None if it is virtual).
+
+        The codes are cached until the diagram changes.  Crossings
+        which are reversed with reverse_crossing, or made virtual or
+        classical with toggle_virtual, are patched into the cached
+        codes instead.
+        """
+        cache = self.code_cache
+        if cache is None or cache['generation'] != self.generation_count:
+            components = self.crossing_components()
+            if not components:
+                return None
+            cache = self.code_cache = self._encode(components)
+        else:
+            over, under = cache['over'], cache['under']
+            for crossing in self.Crossings:
+                crossing.hit1, crossing.hit2 = over.get(crossing), under.get(crossing)
+        return {'DT': list(cache['DT']),
+                'signed_DT': list(cache['signed_DT']),
+                'Gauss': list(cache['Gauss']),
+                'PD': list(cache['PD']),
+                'link': cache['link']}
+
+    def _encode(self, components):
+        over, under, gauss, numbers = {}, {}, [], {}
+        label = 0
+        for component in components:
+            for ec in component:
+                crossing = ec.crossing
+                if crossing.is_virtual:
+                    continue
+                label += 1
+                n = numbers.setdefault(crossing, len(numbers) + 1)
+                if ec.goes_over():
+                    over[crossing] = label
+                    gauss.append(n)
+                else:
+                    under[crossing] = label
+                    gauss.append(-n)
+        entries = []
+        for crossing in self.Crossings:
+            a, b = over.get(crossing), under.get(crossing)
+            crossing.hit1, crossing.hit2 = a, b
+            if a is not None and b is not None:
+                entries.append((min(a, b), crossing))
+        entries.sort(key=lambda x: x[0])
+        signed_dt = [(over[c], under[c], c.sign()) for m, c in entries]
+        max_val = 2 * len(signed_dt)
+        return {'DT': [(a, b) for a, b, sign in signed_dt],
+                'signed_DT': signed_dt,
+                'Gauss': gauss,
+                'PD': [self._PD_tuple(a, b, sign, max_val)
+                       for a, b, sign in signed_dt],
+                'link': len(components) > 1 and len(self.Crossings) > 0,
+                # What is needed to patch the codes.
+                'generation': self.generation_count,
+                'components': components,
+                'over': over,
+                'under': under,
+                'position': {c: n for n, (m, c) in enumerate(entries)}}
+
+    @staticmethod
+    def _PD_tuple(a, b, sign, max_val):
+        c, d = a + 1, b + 1
+        if b == max_val:
+            d = 1
+        elif a == max_val:
+            c = 1
+        return (a, b, c, d) if sign == 'RH' else (a, d, c, b)
+
+    def reverse_crossing(self, crossing):
+        """
+        Interchange the over and under arrows of a crossing.  If the
+        codes are cached, the entries for this crossing are patched
+        rather than computing all of the codes again.
+        """
+        cache = self.code_cache
+        valid = cache is not None and cache['generation'] == self.generation_count
+        crossing.reverse()
+        self.changed()
+        if not valid:
+            return
+        cache['generation'] = self.generation_count
+        if crossing.is_virtual:
+            return
+        over, under = cache['over'], cache['under']
+        a, b = over.get(crossing), under.get(crossing)
+        n = cache['position'].get(crossing)
+        if a is None or b is None or n is None:
+            self.code_cache = None
+            return
+        # The labels stay where they are, but the one which was over
+        # is now under.  The sign of the crossing changes too.
+        over[crossing], under[crossing] = b, a
+        crossing.hit1, crossing.hit2 = b, a
+        sign = crossing.sign()
+        cache['signed_DT'][n] = (b, a, sign)
+        cache['DT'][n] = (b, a)
+        cache['PD'][n] = self._PD_tuple(b, a, sign, 2 * len(cache['DT']))
+        gauss = cache['Gauss']
+        gauss[a - 1], gauss[b - 1] = -gauss[a - 1], -gauss[b - 1]
+
+    def toggle_virtual(self, crossing):
+        """
+        Make a classical crossing virtual, or a virtual one classical.
+        If the codes are cached, they are relabeled from the cached
+        crossing components, without traversing the diagram again.
+        """
+        cache = self.code_cache
+        valid = cache is not None and cache['generation'] == self.generation_count
+        crossing.is_virtual = not crossing.is_virtual
+        self.changed()
+        if valid:
+            self.code_cache = self._encode(cache['components'])
+
+    def new_DT(self, sign=False):
+        """
+        Return the DT code as a list of (over, under) label pairs, or
+        of (over, under, sign) triples if sign is True, followed by the
+        link flag.  See crossing_codes.
+        """
+        codes = self.crossing_codes()
+        if codes is None:
+            return None
+        return codes['signed_DT' if sign else 'DT'] + [codes['link']]
 
     def DT_code(self, alpha=False, signed=True, return_sizes=False):
         """
@@ -532,7 +1092,19 @@ class LinkManager:
 
         If return_sizes is set to True, a list of the number of crossings
         in each component is returned (this is for use by Gauss_code).
+
+        The code is cached until the diagram changes.  The DT labels are
+        left on the crossings, as hit1 and hit2, either way.
         """
+        def compute():
+            code = self._DT_code(alpha, signed, return_sizes)
+            return code, self.crossing_marks()
+
+        code, marks = self.cached(('DT', alpha, signed, return_sizes), compute)
+        self.restore_marks(marks)
+        return code
+
+    def _DT_code(self, alpha, signed, return_sizes):
         sorted_components = self.sorted_components()
         if sorted_components is None or len(sorted_components) == 0:
             return (None, None) if return_sizes else None
@@ -584,69 +1156,14 @@ class LinkManager:
         return tuple(result)
 
     def new_Gauss(self):
-        dt = self.new_DT()
-        link = dt.pop()
-        gauss = []
-        # gauss = [0 for i in range(2*len(dt))]
-        # seems to work, also has proper signs :)
-        # iterates from 1 to twice the num of crossings
-        # finds chronological order of crossings, takes the min
-        # but keeps the sign of the current i value ie.
-        # DT (2, 5) if i == 5 will give gauss of -2
-        for i in range(1, (len(dt) * 2) + 1):
-            for crossing in dt:
-                if i in crossing:
-                    temp = min(crossing)
-                    if i == crossing[1]:
-                        temp *= -1
-                    gauss.append(temp)
-        # gauss = [i if i < int(len(gauss)/2) else i-1 for i in gauss]
-
-        # count consecutive gauss, decrease each value greater than pivot by ++1 for each cycle over the reference
-        # then increase the reference at each step.
-        # add item to help menu 'convention' menu that explains virtual DT, Gauss, PD
-        # this all works, just has some +1/-1 issue somewhere in the iterations...
-        pivot = None
-        fixed_gauss = gauss.copy()
-
-        def count_cycle(splice, ind):
-            cycle = 0
-            for c in splice:
-                for j in splice[splice.index(c):]:
-                    if abs(j) == abs(c) and j != c:
-                        cycle += 1
-            print('before\n', gauss[ind:])
-            back_splice = update_gauss(cycle, gauss[ind:])
-            print(back_splice)
-            return cycle, back_splice
-
-        def update_gauss(cycles, splice):
-            tmp = []
-            for c in splice:
-                if abs(c) > pivot + cycles:
-                    if c > 0:
-                        c -= 1
-                    else:
-                        c += 1
-                tmp.append(c)
-            return tmp
-
-        for i, code in enumerate(gauss):
-            if i == 0:
-                continue
-            if abs(code) == abs(gauss[i - 1]) + 1:
-                continue
-            else:
-                if pivot is None:
-                    pivot = abs(gauss[i - 1])
-                if pivot:
-                    cyc, tail = count_cycle(gauss[:i+1], i)
-                    gauss = gauss[:i] + tail
-                print(f"nonconsecutive at {code}, cycles:{cyc}, pivot:{pivot+cyc}")
-
-        gauss.append(link)
-
-        return gauss
+        """
+        Return the Gauss code as a list of signed crossing numbers,
+        followed by the link flag.  See crossing_codes.
+        """
+        codes = self.crossing_codes()
+        if codes is None:
+            return None
+        return codes['Gauss'] + [codes['link']]
 
     def Gauss_code(self):
         """
@@ -679,30 +1196,229 @@ class LinkManager:
             start = end
         return gauss
 
+    def linking_matrix(self):
+        """
+        Return the square matrix, indexed by the components in the
+        order of arrow_components(), whose entry (i, j) is the sum of
+        the signs (+1 for right handed, -1 for left handed) of the
+        crossings where component i passes over component j.  For a
+        classical link this is the linking number of the two
+        components, and the matrix is symmetric.  The diagonal entry
+        (i, i) is the writhe of component i, i.e. the sum of the signs
+        of its self-crossings, which is its blackboard framing.
+        Virtual crossings are not counted.
+
+        The matrix is a NumPy integer array if NumPy is available, and
+        otherwise a list of lists.  Requires that all components be
+        closed; returns None otherwise.
+        """
+        matrix = self.cached('linking_matrix', self._linking_matrix)
+        if matrix is None:
+            return None
+        if have_numpy:
+            return numpy.array(matrix, dtype=int).reshape(len(matrix), len(matrix))
+        return [list(row) for row in matrix]
+
+    def _linking_matrix(self):
+        if any(vertex.is_endpoint() for vertex in self.Vertices):
+            return None
+        component = self.component_ids()
+        size = len(set(component.values()))
+        matrix = [[0] * size for n in range(size)]
+        signs = {'RH': 1, 'LH': -1}
+        for crossing in self.Crossings:
+            if crossing.is_virtual:
+                continue
+            i, j = component[crossing.over], component[crossing.under]
+            matrix[i][j] += signs.get(crossing.sign(), 0)
+        return matrix
+
+    def planar_map(self, skip_virtual=False):
+        """
+        Return a PlanarMap describing the graph of the diagram and its
+        faces, with the virtual crossings as vertices unless
+        skip_virtual is True.  Requires that all components be closed;
+        returns None otherwise.  The map is cached until the diagram
+        changes, and should not be modified.
+        """
+        return self.cached(('planar_map', skip_virtual),
+                           lambda: self._planar_map(skip_virtual))
+
+    def _planar_map(self, skip_virtual):
+        try:
+            components = self.crossing_components()
+        except ValueError:
+            return None
+        return PlanarMap(components, skip_virtual)
+
+    def virtual_genus(self):
+        """
+        Return the genus of the surface carrying the diagram, which is
+        0 for a classical diagram.  The surface is built from a disk
+        at each classical crossing and a band along each arc between
+        classical crossings, with the virtual crossings ignored; its
+        boundary circles are capped off with disks.  If the diagram
+        has several pieces, which are joined only by virtual crossings
+        or not at all, the genera of their surfaces are added.  This is
+        an upper bound for the virtual genus of the link.  Requires
+        that all components be closed; returns None otherwise.
+        """
+        planar_map = self.planar_map(skip_virtual=True)
+        if planar_map is None:
+            return None
+        return planar_map.genus()
+
+    def goeritz_matrices(self):
+        """
+        Return a list of pairs (G, mu), one for each connected piece of
+        the diagram, where G is a Goeritz matrix built from a
+        checkerboard coloring of the faces of the piece and mu is the
+        Gordon-Litherland correction term; see
+        invariants.goeritz_matrices.  Requires that all components be
+        closed and that no crossing be virtual; returns None otherwise.
+        """
+        if any(crossing.is_virtual for crossing in self.Crossings):
+            return None
+        planar_map = self.planar_map()
+        if planar_map is None:
+            return None
+        return self.cached('goeritz', lambda: goeritz_matrices(planar_map))
+
+    def signature(self):
+        """
+        Return the signature of the link, which is the sum over the
+        pieces of the diagram of the signature of the Goeritz matrix
+        minus the correction term.  The right handed trefoil has
+        signature -2.  Returns None if the diagram is open or virtual.
+        """
+        invariants = self._goeritz_invariants()
+        return invariants and invariants[0]
+
+    def determinant(self):
+        """
+        Return the determinant of the link, the absolute value of the
+        determinant of a Goeritz matrix.  It is 0 for a split diagram.
+        Returns None if the diagram is open or virtual.
+        """
+        invariants = self._goeritz_invariants()
+        return invariants and invariants[1]
+
+    def _goeritz_invariants(self):
+        matrices = self.goeritz_matrices()
+        if matrices is None:
+            return None
+        return self.cached('goeritz_invariants',
+                           lambda: self._signature_and_determinant(matrices))
+
+    def _signature_and_determinant(self, matrices):
+        signature, determinant = 0, 1
+        for G, mu in matrices:
+            sigma, det = signature_and_determinant(G)
+            signature += sigma - mu
+            determinant *= det
+        if len(matrices) + self.planar_map().free_loops > 1:
+            determinant = 0
+        return signature, determinant
+
+    def alexander_polynomial(self):
+        """
+        Return the Alexander polynomial of the link, as a list of
+        integer coefficients starting with the constant term, computed
+        from the Wirtinger presentation whose generators are the arcs
+        of the diagram between undercrossings; see
+        invariants.alexander_polynomial.  The figure eight knot gives
+        [1, -3, 1].  A split diagram gives [0].  Requires that all
+        components be closed and that no crossing be virtual; returns
+        None otherwise.
+        """
+        if any(crossing.is_virtual for crossing in self.Crossings):
+            return None
+        planar_map = self.planar_map()
+        if planar_map is None:
+            return None
+        return self.cached('alexander', lambda: self._alexander(planar_map))
+
+    def _alexander(self, planar_map):
+        if planar_map.pieces() + planar_map.free_loops > 1:
+            return [0]
+        if not planar_map.crossings:
+            return [1]
+        num_arcs, relations = wirtinger_relations(self.crossing_components())
+        return alexander_polynomial(num_arcs, relations)
+
+    def kauffman_bracket(self, processes=None):
+        """
+        Return the Kauffman bracket of the diagram, as a dict which maps
+        each power of A to its coefficient, with the virtual crossings
+        treated as virtual; see invariants.kauffman_bracket.  If
+        processes is greater than 1, the work is shared by that many
+        processes.  Requires that all components be closed; returns
+        None otherwise, or if the diagram is empty.  The result is
+        cached until the diagram changes, and should not be modified.
+        It does not depend on processes, so there is one cached value
+        whatever processes is, and a later call with more processes
+        returns it without starting any.
+        """
+        planar_map = self.planar_map(skip_virtual=True)
+        if planar_map is None or not (planar_map.crossings or
+                                      planar_map.free_loops):
+            return None
+        return self.cached('kauffman_bracket',
+                           lambda: kauffman_bracket(planar_map, processes))
+
+    def jones_polynomial(self, processes=None):
+        """
+        Return the Jones polynomial of the link, or of the virtual link
+        if some crossings are virtual, as a dict which maps each power
+        of t to its coefficient.  See kauffman_bracket for the
+        arguments.  The right handed trefoil gives {1: 1, 3: 1, 4: -1}.
+        """
+        bracket = self.kauffman_bracket(processes)
+        if bracket is None:
+            return None
+        signs = {'RH': 1, 'LH': -1}
+        writhe = sum(signs[c.sign()] for c in self.Crossings
+                     if not c.is_virtual)
+        return jones_polynomial(bracket, writhe)
+
+    def fingerprint(self, mirror=False):
+        """
+        Return a hexadecimal string which identifies the diagram
+        combinatorially.  Diagrams have the same fingerprint when
+        their signed Gauss codes agree up to renumbering the crossings,
+        reordering the components, moving the starting points and
+        reversing the orientation of the whole link (and, if mirror is
+        True, taking the mirror image).  It does not depend on the
+        coordinates of the vertices or the order in which they were
+        drawn.  Virtual crossings are not part of the Gauss code.
+        Requires that all components be closed; returns None otherwise.
+        See canonical.canonical_code.
+        """
+        return self.cached(('fingerprint', mirror),
+                           lambda: self._fingerprint(mirror))
+
+    def _fingerprint(self, mirror):
+        try:
+            components = self.crossing_components()
+        except ValueError:
+            return None
+        signs = {'RH': 1, 'LH': -1}
+        passages = [[(ec.crossing, ec.goes_over(), signs.get(ec.crossing.sign(), 0))
+                     for ec in component if not ec.crossing.is_virtual]
+                    for component in components]
+        code = canonical_code(passages, mirror)
+        return hashlib.sha256(repr(code).encode('ascii')).hexdigest()
+
     def BB_framing(self):
         """
         Return the standard meridian-longitude coordinates of the
         blackboard longitude (i.e. the peripheral element obtained
         by following the top of a tubular neighborhood of the knot).
         """
-        try:
-            components = self.crossing_components()
-        except ValueError:
+        matrix = self.linking_matrix()
+        if matrix is None:
             return None
-        framing = []
-        for component in components:
-            m = 0
-            for ec in component:
-                crossing = ec.crossing
-                # Only consider self crossings
-                if crossing.comp1 == crossing.comp2 == component:
-                    if ec.crossing.sign() == 'RH':
-                        m += 1
-                    elif ec.crossing.sign() == 'LH':
-                        m -= 1
-            # Each crossing got counted twice.
-            framing.append((m // 2, 1))
-        return framing
+        return [(int(matrix[n][n]), 1) for n in range(len(matrix))]
 
     def write_text(self, text):
         # Subclasses override this
@@ -785,72 +1501,69 @@ class LinkManager:
         components = self.arrow_components()
         result += '%d\n' % len(components)
         for component in components:
-            first = self.Vertices.index(component[0].start)
-            last = self.Vertices.index(component[-1].end)
+            first = self.vertex_id(component[0].start)
+            last = self.vertex_id(component[-1].end)
             result += '%4.1d %4.1d\n' % (first, last)
         result += '%d\n' % len(self.Vertices)
         for vertex in self.Vertices:
             result += '%5.1d %5.1d\n' % vertex.point()
         result += '%d\n' % len(self.Arrows)
         for arrow in self.Arrows:
-            start_index = self.Vertices.index(arrow.start)
-            end_index = self.Vertices.index(arrow.end)
+            start_index = self.vertex_id(arrow.start)
+            end_index = self.vertex_id(arrow.end)
             result += '%4.1d %4.1d\n' % (start_index, end_index)
         result += '%d\n' % len(self.Crossings)
         for crossing in self.Crossings:
-            under = self.Arrows.index(crossing.under)
-            over = self.Arrows.index(crossing.over)
+            under = self.arrow_id(crossing.under)
+            over = self.arrow_id(crossing.over)
             is_virtual = 'v' if crossing.is_virtual else 'r'
             result += '%4s %4.1d %4.1d\n' % (is_virtual, under, over) if has_virtual_crossings else '%4.1d %4.1d\n' % (
                 under, over)
         if self.ActiveVertex:
-            result += '%d\n' % self.Vertices.index(self.ActiveVertex)
+            result += '%d\n' % self.vertex_id(self.ActiveVertex)
         else:
             result += '-1\n'
         return result
 
-    def twister_surface_file(self):
+    def twister_surface_file(self, outfile=None):
         """
         Returns a string containing the contents of a Twister surface
         file. Raises a ValueError if there are no virtual crossings.
+
+        If a file-like object is given as outfile, the file is written
+        to it one line at a time instead, and None is returned.
         """
-        result = '# A Twister surface file produced by PLink.\n'
-        virtual_crossings = [crossing for crossing in self.Crossings if crossing.is_virtual]
-        if len(virtual_crossings) == 0:
+        virtual_index = {}
+        for crossing in self.Crossings:
+            if crossing.is_virtual:
+                virtual_index[crossing] = len(virtual_index)
+        if len(virtual_index) == 0:
             raise ValueError('No virtual crossings present.')
         closed_components, nonclosed_components = self.arrow_components(distinguish_closed=True)
+        result = io.StringIO() if outfile is None else outfile
 
         def component_sequence(component):
             sequence = []
             for arrow in component:
-                this_arrows_crossings = []
-                for index, virtual_crossing in enumerate(virtual_crossings):
-                    if arrow == virtual_crossing.under:
-                        other_arrow = virtual_crossing.over
-                    elif arrow == virtual_crossing.over:
-                        other_arrow = virtual_crossing.under
-                    else:
+                for t, crossing in arrow.crossings_along(self.Crossings):
+                    index = virtual_index.get(crossing)
+                    if index is None:
                         continue
+                    other_arrow = crossing.over if arrow is crossing.under else crossing.under
                     sign = (arrow.dx * other_arrow.dy - arrow.dy * other_arrow.dx > 0)
-                    this_arrows_crossings.append(
-                        (arrow ^ other_arrow, index, '+' if sign else '-'))
-                this_arrows_crossings.sort()
-                sequence += [pm + str(index) for _, index, pm in this_arrows_crossings]
+                    sequence.append(('+' if sign else '-') + str(index))
             return sequence
 
-        curves = list(ascii_lowercase) + ['%s%d' % (letter, index)
-                                          for index in range((len(closed_components) + len(nonclosed_components)) // 26)
-                                          for letter in ascii_lowercase]
-        i = 0
-        for component in closed_components:
-            result += 'annulus,%s,%s,%s#\n' % (
-                curves[i], curves[i].swapcase(), ','.join(component_sequence(component)))
-            i += 1
-        for component in nonclosed_components:
-            result += 'rectangle,%s,%s,%s#\n' % (
-                curves[i], curves[i].swapcase(), ','.join(component_sequence(component)))
-            i += 1
-        return result
+        result.write('# A Twister surface file produced by PLink.\n')
+        curves = curve_names()
+        for kind, components in [('annulus', closed_components),
+                                 ('rectangle', nonclosed_components)]:
+            for component in components:
+                curve = next(curves)
+                result.write('%s,%s,%s,%s#\n' % (
+                    kind, curve, curve.swapcase(), ','.join(component_sequence(component))))
+        if outfile is None:
+            return result.getvalue()
 
     def save_as_tikz(self, file_name, colormode='color', width=282.0):
         polylines = self.polylines(break_at_overcrossings=True)
@@ -882,19 +1595,24 @@ class LinkManager:
         for x, y in vertices:
             X, Y = float(x), float(y)
             self.Vertices.append(Vertex(X, Y, self.canvas))
+        self.changed(topology=True)
+        self.renumber(self.Vertices)
+        self.reindex_vertices()
         for start, end in arrows:
             S, E = self.Vertices[int(start)], self.Vertices[int(end)]
             self.Arrows.append(Arrow(S, E, self.canvas))
+        self.renumber(self.Arrows)
         for under, over, is_virtual, label in crossings:
             U, O, V, L = self.Arrows[int(under)], self.Arrows[int(over)], bool(is_virtual), str(label)
             self.Crossings.append(Crossing(O, U, V, L))
+        self.reindex_arrows()
 
     def pickle(self):
         """
         Inverse of unpickle.
         """
-        V = lambda v: self.Vertices.index(v)
-        A = lambda a: self.Arrows.index(a)
+        V = self.vertex_id
+        A = self.arrow_id
         vertices = [(v.x, v.y) for v in self.Vertices]
         arrows = [(V(a.start), V(a.end)) for a in self.Arrows]
         crossings = [(A(c.under), A(c.over), c.is_virtual, c.label) for c in self.Crossings]
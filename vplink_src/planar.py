@@ -0,0 +1,171 @@
+#
+#   Copyright (C) 2007-present Marc Culler, Nathan Dunfield and others.
+#
+#   This program is distributed under the terms of the
+#   GNU General Public License, version 2 or later, as published by
+#   the Free Software Foundation.  See the file gpl-2.0.txt for details.
+#   The URL for this program is
+#     http://www.math.uic.edu/~t3m/plink
+#   A copy of the license file may be found at:
+#     http://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+#
+#   The development of this program was partially supported by
+#   the National Science Foundation under grants DMS0608567,
+#   DMS0504975 and DMS0204142.
+"""
+This module exports the class PlanarMap, which describes the 4-valent
+graph of a link diagram, embedded in a surface, by half-edges.
+"""
+from array import array
+
+# The positions of the four half-edges at a crossing, in
+# counterclockwise order, following the KLP conventions: the X strand
+# leaving, the Y strand leaving, the X strand arriving and the Y strand
+# arriving.
+slot = {('X', True): 0, ('Y', True): 1, ('X', False): 2, ('Y', False): 3}
+
+
+class PlanarMap:
+    """
+    The graph of a link diagram whose vertices are the crossings and
+    whose edges are the arcs of the components between consecutive
+    crossings, together with the cyclic order of the edges at each
+    crossing.  This determines a surface in which the graph is
+    embedded, and the faces of the embedding.  For a classical
+    diagram the surface is a union of spheres.
+
+    The argument is a list of crossing components, as returned by
+    LinkManager.crossing_components.  If skip_virtual is True the
+    virtual crossings are not vertices; the edges pass through them,
+    as on the surface of the diagram used to define virtual knots.
+
+    Edge e runs from the crossing of one passage to the crossing of
+    the next passage along its component.  It has two half-edges: 2*e
+    leaves the first crossing in the direction of the component, and
+    2*e + 1 leaves the second crossing against it.  The arrays are:
+
+       * origin[h]: the crossing, as an index into crossings, which
+       the half-edge h leaves;
+
+       * rotation[h]: the next half-edge counterclockwise around the
+       origin of h;
+
+       * face[h]: the face on the right of h, as an index into faces;
+
+       * at[4*v + s]: the half-edge in position s at crossing v, where
+       the positions are numbered counterclockwise, starting with the
+       X strand leaving the crossing (see Crossing.strand);
+
+       * component[e]: the component containing edge e.
+
+    The faces are lists of half-edges, each followed by the half-edge
+    rotation[h ^ 1], and the corner between h and rotation[h] lies in
+    face[rotation[h]].  Components with no crossings are not part of
+    the graph; there are free_loops of them.
+    """
+
+    def __init__(self, components, skip_virtual=False):
+        self.crossings, self.index = [], {}
+        passages = []
+        for component in components:
+            passages.append([ec for ec in component
+                             if not (skip_virtual and ec.crossing.is_virtual)])
+            for ec in passages[-1]:
+                if ec.crossing not in self.index:
+                    self.index[ec.crossing] = len(self.crossings)
+                    self.crossings.append(ec.crossing)
+        self.free_loops = sum(1 for P in passages if not P)
+        num_edges = sum(len(P) for P in passages)
+        self.origin = array('i', [0]) * (2 * num_edges)
+        self.at = array('i', [-1]) * (4 * len(self.crossings))
+        self.component = array('i')
+        e = 0
+        for n, P in enumerate(passages):
+            first = e
+            for k, ec in enumerate(P):
+                # Edge e leaves this passage and arrives at the next.
+                v = self.index[ec.crossing]
+                w = self.index[P[(k + 1) % len(P)].crossing]
+                self.origin[2 * e], self.origin[2 * e + 1] = v, w
+                self.at[4 * v + slot[ec.strand, True]] = 2 * e
+                before = e - 1 if k > 0 else first + len(P) - 1
+                self.at[4 * v + slot[ec.strand, False]] = 2 * before + 1
+                self.component.append(n)
+                e += 1
+        if -1 in self.at:
+            raise ValueError('A crossing has an undefined sign.')
+        self.rotation = array('i', [0]) * (2 * num_edges)
+        for v in range(len(self.crossings)):
+            for s in range(4):
+                self.rotation[self.at[4 * v + s]] = self.at[4 * v + (s + 1) % 4]
+        self.face = array('i', [-1]) * (2 * num_edges)
+        self.faces = []
+        for h in range(2 * num_edges):
+            if self.face[h] >= 0:
+                continue
+            boundary = []
+            while self.face[h] < 0:
+                self.face[h] = len(self.faces)
+                boundary.append(h)
+                h = self.rotation[h ^ 1]
+            self.faces.append(boundary)
+
+    def __repr__(self):
+        return 'PlanarMap with %d crossings, %d edges and %d faces' % (
+            len(self.crossings), self.num_edges(), len(self.faces))
+
+    def num_edges(self):
+        return len(self.origin) // 2
+
+    def pieces(self):
+        """
+        Return the number of connected pieces of the graph, not
+        counting the free loops.
+        """
+        parent = list(range(len(self.crossings)))
+
+        def root(v):
+            while parent[v] != v:
+                parent[v] = parent[parent[v]]
+                v = parent[v]
+            return v
+
+        for e in range(self.num_edges()):
+            parent[root(self.origin[2 * e])] = root(self.origin[2 * e + 1])
+        return len(set(root(v) for v in range(len(self.crossings))))
+
+    def euler_characteristic(self):
+        """
+        Return V - E + F for the surface, not counting the free loops.
+        """
+        return len(self.crossings) - self.num_edges() + len(self.faces)
+
+    def genus(self):
+        """
+        Return the total genus of the closed surfaces in which the
+        pieces of the graph are embedded.
+        """
+        return (2 * self.pieces() - self.euler_characteristic()) // 2
+
+    def face_colors(self):
+        """
+        Return a list assigning 0 or 1 to each face so that the two
+        faces on either side of an edge have different colors (a
+        checkerboard coloring), or None if there is no such coloring.
+        The first face of each piece gets color 0.
+        """
+        color = [None] * len(self.faces)
+        for start in range(len(self.faces)):
+            if color[start] is not None:
+                continue
+            color[start], stack = 0, [start]
+            while stack:
+                f = stack.pop()
+                for h in self.faces[f]:
+                    g = self.face[h ^ 1]
+                    if color[g] is None:
+                        color[g] = 1 - color[f]
+                        stack.append(g)
+                    elif color[g] == color[f]:
+                        return None
+        return color
@@ -0,0 +1,242 @@
+#
+#   Copyright (C) 2007-present Marc Culler, Nathan Dunfield and others.
+#
+#   This program is distributed under the terms of the
+#   GNU General Public License, version 2 or later, as published by
+#   the Free Software Foundation.  See the file gpl-2.0.txt for details.
+#   The URL for this program is
+#     http://www.math.uic.edu/~t3m/plink
+#   A copy of the license file may be found at:
+#     http://www.gnu.org/licenses/old-licenses/gpl-2.0.html
+#
+#   The development of this program was partially supported by
+#   the National Science Foundation under grants DMS0608567,
+#   DMS0504975 and DMS0204142.
+"""
+This module exports the classes SegmentGrid and PointGrid.  These are
+uniform grids of buckets which are used by the LinkManager to find the
+arrows, vertices and crossings of a diagram which lie near a given
+point or segment without scanning all of them.
+"""
+from math import floor
+
+
+class SegmentGrid:
+    """
+    A spatial index for items with axis-parallel bounding boxes.
+
+    The plane is divided into square cells and each item is recorded
+    in every cell met by its bounding box.  Two items whose boxes
+    overlap always share a cell, so a query only needs to look at the
+    items in the cells met by the query box.  The grid can be
+    translated in constant time, which makes panning free.
+    """
+    min_cell_size = 16.0
+
+    def __init__(self, cell_size=40.0):
+        self.cell_size = float(cell_size)
+        self.origin = (0.0, 0.0)
+        self.cells = {}
+        self.boxes = {}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, item):
+        return item in self.boxes
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size, (ox, oy) = self.cell_size, self.origin
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+        return (int(floor((x0 - ox) / size)), int(floor((y0 - oy) / size)),
+                int(floor((x1 - ox) / size)), int(floor((y1 - oy) / size)))
+
+    def insert(self, item, x0, y0, x1, y1):
+        """
+        Add an item with the given bounding box, or move it if it is
+        already in the grid.
+        """
+        box = self._cell_range(x0, y0, x1, y1)
+        old_box = self.boxes.get(item)
+        if old_box == box:
+            return
+        if old_box is not None:
+            self.remove(item)
+        self.boxes[item] = box
+        i0, j0, i1, j1 = box
+        cells = self.cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                try:
+                    cells[i, j][item] = None
+                except KeyError:
+                    cells[i, j] = {item: None}
+
+    def remove(self, item):
+        box = self.boxes.pop(item, None)
+        if box is None:
+            return
+        i0, j0, i1, j1 = box
+        cells = self.cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells[i, j]
+                del cell[item]
+                if not cell:
+                    del cells[i, j]
+
+    def query(self, x0, y0, x1, y1, margin=0.0):
+        """
+        Return a list of the items whose cells meet the given box,
+        enlarged by the margin.  Every item whose bounding box meets
+        the enlarged box is included, along with a few near misses.
+        """
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+        i0, j0, i1, j1 = self._cell_range(x0 - margin, y0 - margin,
+                                          x1 + margin, y1 + margin)
+        cells, found = self.cells, {}
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    found.update(cell)
+        return list(found)
+
+    def translate(self, dx, dy):
+        """
+        Account for a translation of every item in the grid.
+        """
+        ox, oy = self.origin
+        self.origin = (ox + dx, oy + dy)
+
+    def clear(self):
+        self.cells = {}
+        self.boxes = {}
+        self.origin = (0.0, 0.0)
+
+    def rebuild(self, entries):
+        """
+        Replace the contents of the grid by the given (item, x0, y0,
+        x1, y1) entries.  The cell size is adapted to the typical size
+        of the items, so that each item meets only a few cells.
+        """
+        entries = list(entries)
+        self.clear()
+        if entries:
+            total = sum(max(abs(x1 - x0), abs(y1 - y0))
+                        for _, x0, y0, x1, y1 in entries)
+            self.cell_size = max(self.min_cell_size, total / len(entries))
+        for entry in entries:
+            self.insert(*entry)
+
+
+class PointGrid:
+    """
+    A spatial index for items located at points, such as vertices and
+    crossings.  It answers the question "which item is nearest to
+    this point, within a given distance" by looking only at the cells
+    near the point.  Distances are measured with the same L1 norm
+    that Vertex.__eq__ uses.
+    """
+
+    def __init__(self, cell_size=16.0):
+        self.cell_size = float(cell_size)
+        self.origin = (0.0, 0.0)
+        self.cells = {}
+        self.points = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, item):
+        return item in self.points
+
+    def _cell(self, x, y):
+        size, (ox, oy) = self.cell_size, self.origin
+        return int(floor((x - ox) / size)), int(floor((y - oy) / size))
+
+    def insert(self, item, x, y):
+        """
+        Add an item at the given point, or move it there if it is
+        already in the grid.
+        """
+        key = self._cell(x, y)
+        old = self.points.get(item)
+        if old is not None and old[2] != key:
+            self.remove(item)
+        self.points[item] = (x - self.origin[0], y - self.origin[1], key)
+        try:
+            self.cells[key][item] = None
+        except KeyError:
+            self.cells[key] = {item: None}
+
+    def remove(self, item):
+        entry = self.points.pop(item, None)
+        if entry is None:
+            return
+        cell = self.cells[entry[2]]
+        del cell[item]
+        if not cell:
+            del self.cells[entry[2]]
+
+    def query(self, x0, y0, x1, y1, margin=0.0):
+        """
+        Return a list of the items in the cells which meet the given
+        box, enlarged by the margin.
+        """
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+        i0, j0 = self._cell(x0 - margin, y0 - margin)
+        i1, j1 = self._cell(x1 + margin, y1 + margin)
+        cells, found = self.cells, []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    found.extend(cell)
+        return found
+
+    def nearest(self, x, y, radius, condition=None):
+        """
+        Return the item nearest to (x, y) among those at distance less
+        than radius which satisfy the condition, or None if there is
+        no such item.
+        """
+        ox, oy = self.origin
+        best, best_distance = None, radius
+        for item in self.query(x, y, x, y, radius):
+            px, py, _ = self.points[item]
+            distance = abs(px + ox - x) + abs(py + oy - y)
+            if distance < best_distance:
+                if condition is None or condition(item):
+                    best, best_distance = item, distance
+        return best
+
+    def translate(self, dx, dy):
+        """
+        Account for a translation of every item in the grid.
+        """
+        ox, oy = self.origin
+        self.origin = (ox + dx, oy + dy)
+
+    def clear(self):
+        self.cells = {}
+        self.points = {}
+        self.origin = (0.0, 0.0)
+
+    def rebuild(self, entries):
+        """
+        Replace the contents of the grid by the given (item, x, y)
+        entries.
+        """
+        self.clear()
+        for entry in entries:
+            self.insert(*entry)
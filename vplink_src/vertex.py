@@ -28,6 +28,7 @@ class Vertex:
         self.x, self.y = float(x), float(y)
         self.in_arrow = None
         self.out_arrow = None
+        self.id = None  # The position in the diagram's list of vertices.
         self.canvas = canvas
         self.color = color
         self.delta = 2
@@ -99,7 +100,7 @@ class Vertex:
     def set_delta(self, delta):
         self.delta = delta
         self.draw()
-        
+
     def is_endpoint(self):
         return self.in_arrow == None or self.out_arrow == None
     
@@ -73,10 +73,8 @@ class LinkViewer(LinkManager):
         return x0, y0, x1, y1
 
     def _shift(self, dx, dy):
-        for vertex in self.Vertices:
-            vertex.x += dx
-            vertex.y += dy
         self.canvas.move(Tk_.ALL, dx, dy)
+        self.translate(dx, dy)
 
     def draw(self):
         # Fit to the canvas